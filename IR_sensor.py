@@ -8,16 +8,65 @@ Purpose: Provides a driver for the IR sensor array used for line following.
          This module includes:
              - IR_Single class: Handles individual IR sensor readings via ADC.
              - IR_Array class: Aggregates multiple IR_Single sensors, reads and normalizes
-               raw sensor values based on dark/light calibrations, computes a centroid, and
-               provides calibration functions.
+               raw sensor values based on dark/light calibrations, computes a centroid
+               and line position, and provides calibration functions.
 """
 
 # ---------
 # Imports
 # ---------
-from pyb import Pin, ADC
+from pyb import Pin, ADC, Timer
+from array import array
+import micropython
+import math
 import time
 
+# Normalized sensor values are fixed-point numbers from 0 (light) to
+# IR_ONE (dark). Per-sensor scale factors carry IR_SHIFT fraction bits, so
+# every intermediate product stays a small integer.
+IR_ONE = 4096
+IR_SHIFT = 12
+
+# Time for the sensors to settle after the emitters are turned on, in us, for
+# line readings and for the calibration readings.
+SETTLE_US = 50
+CAL_SETTLE_US = 250
+
+# Sampling modes. DIRECT reads with the emitters on. DIFFERENTIAL also reads
+# with the emitters off and subtracts the ambient light that reading sees.
+# DIFFERENTIAL_BANKED does the same but lights the ODD and EVEN banks one at a
+# time, so each sensor only sees its own bank's emitters.
+DIRECT = 0
+DIFFERENTIAL = 1
+DIFFERENTIAL_BANKED = 2
+
+ADC_MAX = 4095
+
+# Approximate time ADC.read_timed_multi() takes per conversion on the L476,
+# including setting up the channel, in us. Batch timer ticks are made a
+# quarter longer than this times the channels converted on them, so the
+# conversions fit; overruns counts any readings where they didn't.
+ADC_CONVERT_US = 5
+
+# Which channels produced a reading: all of them, or a window around the line.
+SCAN_FULL = 0
+SCAN_WINDOW = 1
+
+# The line is present when at least one sensor reads this dark, normalized
+LINE_THRESHOLD = IR_ONE // 2
+
+# Spacing of the sensors on the QTR-HD-13A, in mm
+IR_PITCH_MM = 4.0
+
+# Sweep calibration. Every sensor must see this many counts between line and
+# surface, and the weakest sensor's contrast must then grow by less than
+# 1/SWEEP_GROWTH of itself for SWEEP_SETTLE readings in a row. Changes between
+# readings of less than SWEEP_QUIET counts are taken to be noise.
+SWEEP_MIN_CONTRAST = 1000
+SWEEP_SETTLE = 50
+SWEEP_GROWTH = 64
+SWEEP_QUIET = 64
+
 # ----------------------------------
 # IR_Single Class: Single IR Sensor Interface
 # ----------------------------------
@@ -55,23 +104,68 @@ class IR_Array:
 
     Initializes multiple IR_Single sensors based on a provided list of pins.
     Controls sensor enabling via two digital pins and provides methods for:
-         - Reading raw sensor values.
+         - Reading raw sensor values, either in one blocking call or in two
+           phases, start() and collect(), so that a task can yield while the
+           emitters settle.
+         - Optionally cancelling ambient light by subtracting readings taken
+           with the emitters off.
+         - Optionally tracking the line by converting only a window of
+           sensors around the last centroid.
          - Normalizing sensor readings based on dark/light calibration values.
          - Computing a centroid from normalized sensor values.
-         - Performing dark and light calibrations.
+         - Estimating the line position in millimetres, to a fraction of a
+           sensor, and remembering which side it was last seen on.
+         - Performing dark and light calibrations, either from two snapshots
+           or from statistics streamed while sweeping the array over the line.
+
+    Readings are kept in preallocated arrays and normalized in integer
+    fixed-point arithmetic, using scale factors worked out once at
+    calibration. Only locating the line to a fraction of a sensor uses
+    floating point, so a reading allocates just the few floats _locate()
+    works with, and getCentroid() allocates its result.
     """
-    def __init__(self, irPinList, evenPin, oddPin):
+    def __init__(self, irPinList, evenPin, oddPin, batch_timer=None,
+                 oversample=1, sample_freq=25000, sampling=DIRECT,
+                 window=None, full_every=10, pitch_mm=IR_PITCH_MM,
+                 settle_timer=None, on_settled=None):
         """
         Initialize the IR sensor array.
         Args:
             irPinList (list): List of pin identifiers for each IR sensor.
             evenPin (str): Pin for controlling even sensors.
             oddPin (str): Pin for controlling odd sensors.
+            batch_timer (int): Optional timer number for batch acquisition.
+                If given, each reading converts every channel on each tick of
+                this timer with one ADC.read_timed_multi() call instead of
+                reading the channels one at a time from Python.
+            oversample (int): Number of conversions averaged per channel per
+                reading in batch mode.
+            sample_freq (int): Highest batch timer frequency in Hz. The
+                channels read together are all converted on every tick, so
+                for each group of channels the timer is slowed as needed to
+                leave ADC_CONVERT_US per conversion.
+            sampling (int): DIRECT, DIFFERENTIAL or DIFFERENTIAL_BANKED.
+                Differential readings are given in the same form as direct
+                ones taken in the dark, so calibrations carry over.
+            window (int): If given, track the line by converting only the
+                sensors up to this many either side of the sensor nearest
+                the last centroid. Sensors outside the window read as light.
+            full_every (int): When tracking, scan every sensor once in this
+                many readings, and whenever the line has been lost, so a
+                line which leaves the window is found again.
+            pitch_mm (float): Spacing of the sensors, for getPosition().
+            settle_timer (int): Optional timer number used to time the
+                settling waits. 'on_settled' is then called from its
+                interrupt once the sensors enabled by start(), or by
+                collect() for the second bank, have settled, so a task can
+                wait for that instead of checking settled() over and over.
         """
         self.sensor_list = []
         for pinID in range(len(irPinList)):
             new_sensor = IR_Single(irPinList[pinID], pinID + 1)
             self.sensor_list.append(new_sensor)
+        self.adc_list = tuple(sensor.getADC() for sensor in self.sensor_list)
+        n = len(self.sensor_list)
         # Initialize control pins (dimming not yet implemented).
         self.EVEN = Pin(evenPin, mode=Pin.OUT_PP, value=0)
         self.ODD = Pin(oddPin, mode=Pin.OUT_PP, value=0)
@@ -79,46 +173,378 @@ class IR_Array:
         # Calibration lists for dark and light readings.
         self.darkValue = []
         self.lightValue = []
-        self.raw_value_list = []
-        self.normalized_value_list = []
+        self.raw_value_list = array('H', [0] * n)   # Latest raw readings
+        self.normalized_value_list = array('H', [0] * n)  # 0 to IR_ONE
+        self.timestamp = 0  # time.ticks_us() when the last reading was taken
+        self.start_time = 0  # time.ticks_us() when the emitters were enabled
+        self.settle_us = SETTLE_US
+        self.sampling = sampling
+        self.ambient_list = array('H', [0] * n)  # Readings with emitters off
+        self._bank = 0  # Bank lit in a DIFFERENTIAL_BANKED reading, 0 = ODD
+        # Per-sensor normalization constants, set by _computeScales(): light
+        # reading, magnitude of the dark - light span, its sign, and the
+        # reciprocal of the span as a fixed-point scale factor.
+        self.light = array('H', [0] * n)
+        self.span = array('H', [0] * n)
+        self.sign = array('b', [0] * n)
+        self.scale = array('L', [0] * n)
+        self.weighted_sum = 0  # Sum of (index + 1) * normalized value
+        self.total = 0         # Sum of normalized values
+        # Line position, set by _locate(): the darkest reading and the index
+        # of the sensor it's on, whether the line is present, the position
+        # in mm from the centre of the array (positive towards the last
+        # sensor), and the side, -1 or 1, it was last seen on (0 if never)
+        self.pitch_mm = pitch_mm
+        self.peak = 0
+        self.peak_idx = n // 2
+        self.line_present = False
+        self.position = 0.0
+        self.last_side = 0
+        # Sweep calibration statistics per sensor: extremes, mean and sum of
+        # squared deviations (Welford), the previous reading, and the sum and
+        # number of squared changes between readings small enough to be noise
+        self.sw_min = array('H', [0] * n)
+        self.sw_max = array('H', [0] * n)
+        self.sw_mean = array('f', [0] * n)
+        self.sw_m2 = array('f', [0] * n)
+        self.sw_prev = array('H', [0] * n)
+        self.sw_quiet = array('f', [0] * n)
+        self.sw_quiet_count = array('H', [0] * n)
+        self.sw_count = 0
+        self._sw_best = 0   # Largest contrast of the weakest sensor so far
+        self._sw_still = 0  # Readings since that contrast last grew
+        # Batch acquisition: one sample buffer per channel, preallocated
+        self.timer = None
+        self.oversample = max(1, int(oversample))
+        self.sample_bufs = ()
+        self.sample_freq = sample_freq
+        self._freq = sample_freq  # Frequency the batch timer is running at
+        self.overruns = 0  # Batch readings whose ticks were too short
+        if batch_timer is not None:
+            self.timer = Timer(batch_timer, freq=sample_freq)
+            self.sample_bufs = tuple(array('H', [0] * self.oversample)
+                                     for idx in range(n))
+        # Channels to convert for a full scan and for each possible window,
+        # worked out now so that choosing one allocates nothing
+        self._full = self._makeScan(0, n)
+        self._windows = ()
+        if window is not None:
+            width = min(2 * window + 1, n)
+            self._windows = tuple(self._makeScan(lo, lo + width)
+                                  for lo in range(n - width + 1))
+        self._scan = self._full
+        self.scan_mode = SCAN_FULL  # Scan which produced the latest reading
+        self._next_mode = SCAN_FULL  # Scan of the reading being taken
+        self.full_every = full_every
+        self._since_full = 0
+        # Settle timer, run once per wait. The callback is bound once here
+        # so arming the timer allocates nothing
+        self.settle_timer = None
+        self.on_settled = on_settled
+        self.settling = False  # Whether the settle timer is still running
+        self._settled_cb = self._settledInterrupt
+        if settle_timer is not None and on_settled is not None:
+            self.settle_timer = Timer(settle_timer)
+    
+    def _makeScan(self, lo, hi):
+        """
+        Return the channels from index lo up to hi as (lo, hi, groups). The
+        groups are read together: all the channels, then those lit by the
+        ODD bank (sensors 1, 3, ...) and by the EVEN bank, each as
+        (first index, ADCs, sample buffers, batch timer frequency).
+        """
+        odd = lo + lo % 2
+        even = lo + 1 - lo % 2
+        return (lo, hi,
+                ((lo, self.adc_list[lo:hi], self.sample_bufs[lo:hi],
+                  self._batchFreq(hi - lo)),
+                 (odd, self.adc_list[odd:hi:2], self.sample_bufs[odd:hi:2],
+                  self._batchFreq((hi - odd + 1) // 2)),
+                 (even, self.adc_list[even:hi:2], self.sample_bufs[even:hi:2],
+                  self._batchFreq((hi - even + 1) // 2))))
+    
+    def _batchFreq(self, count):
+        """
+        Return the batch timer frequency for converting 'count' channels on
+        each tick: sample_freq, or lower if the conversions need longer.
+        """
+        tick_us = max(1, count * ADC_CONVERT_US * 5 // 4)
+        return min(self.sample_freq, 1000000 // tick_us)
     
     def readArray(self):
         """
         Enable sensors, read raw ADC values from all sensors, then disable sensors.
+        This blocks while the sensors settle; tasks should use start() and
+        collect() instead.
+        """
+        self.start()
+        time.sleep_us(self.settle_us) #Delay to allow the sensors to acclimate
+        while not self.collect():
+            time.sleep_us(self.settle_us)
+    
+    def start(self, settle_us=SETTLE_US, full=False):
+        """
+        Enable the sensors to begin a reading, and return at once. In the
+        differential modes, the emitters-off reading is taken first.
+        Args:
+            settle_us (int): Time the sensors need before collect(), in us.
+            full (bool): Scan every sensor even when tracking, as for a
+                calibration.
+        """
+        self.settle_us = settle_us
+        self._chooseScan(full)
+        if self.sampling == DIRECT:
+            self.enable()
+        else:
+            self._acquire(self.ambient_list, 0)
+            self._bank = 0
+            if self.sampling == DIFFERENTIAL:
+                self.enable()
+            else:
+                self.ODD.value(1)
+        self.start_time = time.ticks_us()
+        self._armSettle()
+    
+    def _armSettle(self):
         """
-        self.enable()
-        time.sleep_us(50) #Delay to allow the sensors to acclimate
-        self.raw_value_list = []
-        for idx in range(len(self.sensor_list)):
-            self.raw_value_list.append(self.sensor_list[idx].getValue())
-        #Get the values from each IR reading and append to the list
+        Start the settle timer, if there is one, to call on_settled once the
+        sensors have had settle_us to settle.
+        """
+        if self.settle_timer is not None:
+            self.settling = True
+            self.settle_timer.init(freq=max(1, 1000000 // self.settle_us),
+                                   callback=self._settled_cb)
+    
+    def _settledInterrupt(self, timer):
+        """
+        Settle timer interrupt: stop the timer, which only runs once per
+        wait, and call on_settled.
+        """
+        timer.deinit()
+        self.settling = False
+        self.on_settled()
+    
+    def isSettling(self):
+        """
+        Return True while the settle timer is running, in which case
+        on_settled will be called when the sensors have settled. Without a
+        settle timer, this is always False and settled() must be checked.
+        """
+        return self.settling
+    
+    def settled(self):
+        """
+        Return True once the sensors enabled by start() have settled.
+        """
+        return time.ticks_diff(time.ticks_us(), self.start_time) >= self.settle_us
+    
+    def _chooseScan(self, full):
+        """
+        Pick the channels for the next reading: a window around the last
+        centroid when tracking the line, otherwise every channel. The scan
+        mode is only reported by getScanMode() once the reading is collected.
+        """
+        windows = self._windows
+        self._since_full += 1
+        if (full or not windows or not self.line_present
+                or self._since_full >= self.full_every):
+            self._scan = self._full
+            self._next_mode = SCAN_FULL
+            self._since_full = 0
+            return
+        lo = self.peak_idx - (windows[0][1] - 1) // 2
+        lo = max(0, min(lo, len(windows) - 1))
+        self._scan = windows[lo]
+        self._next_mode = SCAN_WINDOW
+    
+    def collect(self):
+        """
+        Read raw ADC values from all sensors, then disable sensors. Call
+        start() first and wait until settled() is True. The time the reading
+        is taken is saved for getTimestamp(). In batch mode every channel is
+        converted 'oversample' times and averaged.
+        Returns True when the reading is complete, or False if, when sampling
+        DIFFERENTIAL_BANKED, the EVEN bank has been turned on in its turn and
+        collect() is to be called again once settled() is True.
+        """
+        lo, hi, groups = self._scan
+        if self.sampling == DIRECT:
+            self.timestamp = time.ticks_us()
+            self._acquire(self.raw_value_list, 0)
+        elif self.sampling == DIFFERENTIAL:
+            self.timestamp = time.ticks_us()
+            self._acquire(self.raw_value_list, 0)
+            self._subtract(lo, hi, 1)
+        elif self._bank == 0:
+            self.timestamp = time.ticks_us()
+            self._acquire(self.raw_value_list, 1)
+            self._subtract(groups[1][0], hi, 2)
+            self.ODD.value(0)
+            self.EVEN.value(1)
+            self._bank = 1
+            self.start_time = time.ticks_us()
+            self._armSettle()
+            return False
+        else:
+            self._acquire(self.raw_value_list, 2)
+            self._subtract(groups[2][0], hi, 2)
+        #Get the values from each IR reading into the raw value array
         self.disable() #Disable to conserve battery life
+        self.scan_mode = self._next_mode
+        return True
+    
+    def _acquire(self, target, group):
+        """
+        Read a group of the channels being scanned into the matching places
+        of 'target'.
+        Args:
+            target (array): Array indexed by channel for the readings.
+            group (int): 0 for all channels, 1 for those lit by the ODD bank
+                and 2 for those lit by the EVEN bank.
+        """
+        first, adcs, bufs, freq = self._scan[2][group]
+        step = 1 if group == 0 else 2
+        if self.timer is not None:
+            if freq != self._freq:
+                self.timer.freq(freq)
+                self._freq = freq
+            if not ADC.read_timed_multi(adcs, bufs, self.timer):
+                self.overruns += 1
+            self._average(target, bufs, first, step)
+        else:
+            idx = first
+            for adc in adcs:
+                target[idx] = adc.read()
+                idx += step
+    
+    @micropython.native
+    def _average(self, target, bufs, first, step):
+        """
+        Average each channel's batch samples into 'target'.
+        """
+        count = self.oversample
+        idx = first
+        for buf in bufs:
+            total = 0
+            for sample in range(count):
+                total += buf[sample]
+            target[idx] = total // count
+            idx += step
     
+    @micropython.native
+    def _subtract(self, first, stop, step):
+        """
+        Turn emitters-on readings of the raw array into differential ones.
+        The light the emitters add, the drop from the emitters-off reading,
+        is taken from ADC_MAX, as a direct reading in the dark would be.
+        """
+        raw = self.raw_value_list
+        ambient = self.ambient_list
+        for idx in range(first, stop, step):
+            value = ADC_MAX - (ambient[idx] - raw[idx])
+            if value < 0:
+                value = 0
+            elif value > ADC_MAX:
+                value = ADC_MAX
+            raw[idx] = value
+    
+    @micropython.native
     def normalize(self):
         """
         Normalize the raw ADC values using calibrated dark and light values.
-        Each value is scaled to the 0-1 range.
-        """
-        self.normalized_value_list = []
-        normalized_value = 0
-        for idx in range(len(self.raw_value_list)):
-            try:
-                normalized_value = round((((self.raw_value_list[idx] - self.lightValue[idx]) /
-                                            (self.darkValue[idx] - self.lightValue[idx]))), 5)
-            except ZeroDivisionError:
-                normalized_value = 0.5
-            if normalized_value > 1:
-                self.normalized_value_list.append(1)
-            elif normalized_value < 0:
-                self.normalized_value_list.append(0)
+        Each value is scaled to the 0 to IR_ONE range, where IR_ONE means as
+        dark as the dark calibration. The weighted sum and total used by
+        getCentroid() are added up in the same pass, and the line is then
+        located for getPosition(). Sensors outside the
+        window of a windowed scan are given 0, as over a light surface.
+        """
+        lo, hi = self._scan[0], self._scan[1]
+        raw = self.raw_value_list
+        norm = self.normalized_value_list
+        light = self.light
+        span = self.span
+        sign = self.sign
+        scale = self.scale
+        weighted = 0
+        total = 0
+        for idx in range(len(raw)):
+            width = span[idx]
+            if idx < lo or idx >= hi:
+                value = 0
+            elif width == 0:
+                # Dark and light calibrations read the same
+                value = IR_ONE // 2
             else:
-                self.normalized_value_list.append(normalized_value)
+                # Clamp in raw counts, then scale; the product is at most
+                # IR_ONE << IR_SHIFT
+                diff = (raw[idx] - light[idx]) * sign[idx]
+                if diff <= 0:
+                    value = 0
+                elif diff >= width:
+                    value = IR_ONE
+                else:
+                    value = (diff * scale[idx]) >> IR_SHIFT
+            norm[idx] = value
+            weighted += (idx + 1) * value
+            total += value
+        self.weighted_sum = weighted
+        self.total = total
+        self._locate()
+    
+    def _locate(self):
+        """
+        Find the line from the normalized values. The darkest sensor, or the
+        middle of a run of equally dark ones where the readings saturate, is
+        refined by fitting a parabola through it and the sensors either side.
+        If no sensor is dark enough, the line is lost, and it is put just
+        beyond the end of the array on the side it was last seen.
+        """
+        norm = self.normalized_value_list
+        lo, hi = self._scan[0], self._scan[1]
+        peak = 0
+        first = lo
+        for idx in range(lo, hi):
+            if norm[idx] > peak:
+                peak = norm[idx]
+                first = idx
+        last = first
+        while last + 1 < hi and norm[last + 1] == peak:
+            last += 1
+        self.peak = peak
+        self.peak_idx = (first + last) // 2
+        n = len(norm)
+        if peak < LINE_THRESHOLD:
+            self.line_present = False
+            self.position = self.last_side * (n + 1) / 2 * self.pitch_mm
+            return
+        # Sensors off the end of the array count as reading light
+        left = norm[first - 1] if first > 0 else 0
+        right = norm[last + 1] if last + 1 < n else 0
+        offset = 0.5 * (right - left) / (2 * peak - left - right)
+        self.position = ((first + last) / 2 + offset - (n - 1) / 2) * self.pitch_mm
+        self.line_present = True
+        self.last_side = 1 if self.position >= 0 else -1
+    
+    def _computeScales(self):
+        """
+        Work out the per-sensor normalization constants from the dark and
+        light calibrations. Called after each calibration.
+        """
+        if len(self.darkValue) != len(self.light) or \
+           len(self.lightValue) != len(self.light):
+            return
+        for idx in range(len(self.light)):
+            width = self.darkValue[idx] - self.lightValue[idx]
+            self.light[idx] = self.lightValue[idx]
+            self.sign[idx] = 1 if width >= 0 else -1
+            self.span[idx] = abs(width)
+            self.scale[idx] = (IR_ONE << IR_SHIFT) // abs(width) if width else 0
     
     def updateIR(self):
         """
         Read and normalize sensor values.
         Returns:
-            List of normalized sensor values.
+            Array of normalized sensor values, from 0 to IR_ONE.
         """
         self.readArray()
         self.normalize()
@@ -126,9 +552,47 @@ class IR_Array:
     
     def getList(self):
         """
-        Return the latest normalized sensor values.
+        Return the latest normalized sensor values as a new list of floats
+        from 0 to 1.
         """
-        return self.normalized_value_list
+        return [value / IR_ONE for value in self.normalized_value_list]
+    
+    def getPosition(self):
+        """
+        Return the line position in mm from the centre of the array, positive
+        towards the last sensor in the pin list. While the line is lost, this
+        is a position just past the end of the array on the side where the
+        line was last seen, so steering on it turns back towards the line.
+        """
+        return self.position
+    
+    def isLinePresent(self):
+        """
+        Return True if the latest reading found the line.
+        """
+        return self.line_present
+    
+    def getConfidence(self):
+        """
+        Return how dark the darkest sensor reads, from 0 to 1. Readings well
+        above LINE_THRESHOLD / IR_ONE come from a clear view of the line.
+        """
+        return self.peak / IR_ONE
+    
+    def getScanMode(self):
+        """
+        Return SCAN_FULL or SCAN_WINDOW for the scan which produced the
+        latest collected reading, the one getPosition() describes once it's
+        normalized. A reading started but not yet collected doesn't change it.
+        """
+        return self.scan_mode
+    
+    def getTimestamp(self):
+        """
+        Return the time.ticks_us() time at which the latest reading was taken,
+        so the age of values computed from it can be measured downstream.
+        """
+        return self.timestamp
     
     def getCentroid(self):
         """
@@ -136,42 +600,150 @@ class IR_Array:
         The centroid is a weighted average of sensor indices based on normalized values.
         Returns a default value of 7 if all sensor readings are zero.
         """
-        val = 0
-        for index in range(len(self.normalized_value_list)):
-            val += (index + 1) * self.normalized_value_list[index]
-        try:
-            return val / (sum(self.normalized_value_list))
-        except ZeroDivisionError:
+        if self.total == 0:
             return 7
+        return self.weighted_sum / self.total
     
-    def calibrateDark(self):
+    def calibrateDark(self, read=True):
         """
         Perform dark calibration:
         Enable sensors, wait briefly, read raw values, and store them as dark calibration values.
+        Args:
+            read (bool): Take a new, blocking reading. Pass False to use the
+                reading already taken with start(CAL_SETTLE_US, full=True)
+                and collect().
         Returns the dark calibration values.
         """
         if self.darkValue != None:
-            self.enable()
-            time.sleep_us(200)
-            self.readArray()
-            self.darkValue = self.raw_value_list
-            self.disable()
+            if read:
+                self.start(CAL_SETTLE_US, full=True)
+                time.sleep_us(CAL_SETTLE_US)
+                while not self.collect():
+                    time.sleep_us(CAL_SETTLE_US)
+            self.darkValue = list(self.raw_value_list)
+            self._computeScales()
         return self.darkValue
     
-    def calibrateLight(self):
+    def calibrateLight(self, read=True):
         """
         Perform light calibration:
         Enable sensors, wait briefly, read raw values, and store them as light calibration values.
+        Args:
+            read (bool): Take a new, blocking reading. Pass False to use the
+                reading already taken with start(CAL_SETTLE_US, full=True)
+                and collect().
         Returns the light calibration values later used for normalization.
         """
         if self.lightValue != None:
-            self.enable()
-            time.sleep_us(200)
-            self.readArray()
-            self.lightValue = self.raw_value_list
-            self.disable()
+            if read:
+                self.start(CAL_SETTLE_US, full=True)
+                time.sleep_us(CAL_SETTLE_US)
+                while not self.collect():
+                    time.sleep_us(CAL_SETTLE_US)
+            self.lightValue = list(self.raw_value_list)
+            self._computeScales()
         return self.lightValue
 
+    def startSweep(self):
+        """
+        Clear the sweep calibration statistics. Then, while the array is
+        swept back and forth over the line, take full readings and pass each
+        to sweepSample() until sweepConverged() is True, and finish with
+        finishSweep().
+        """
+        for idx in range(len(self.sw_min)):
+            self.sw_min[idx] = ADC_MAX
+            self.sw_max[idx] = 0
+            self.sw_mean[idx] = 0
+            self.sw_m2[idx] = 0
+            self.sw_quiet[idx] = 0
+            self.sw_quiet_count[idx] = 0
+        self.sw_count = 0
+        self._sw_best = 0
+        self._sw_still = 0
+    
+    @micropython.native
+    def sweepSample(self):
+        """
+        Add the latest raw reading to the sweep calibration statistics. No
+        readings are stored; each one only updates the running values.
+        """
+        raw = self.raw_value_list
+        low = self.sw_min
+        high = self.sw_max
+        mean = self.sw_mean
+        m2 = self.sw_m2
+        prev = self.sw_prev
+        quiet = self.sw_quiet
+        quiet_count = self.sw_quiet_count
+        count = self.sw_count + 1
+        weakest = ADC_MAX
+        for idx in range(len(raw)):
+            value = raw[idx]
+            if value < low[idx]:
+                low[idx] = value
+            if value > high[idx]:
+                high[idx] = value
+            if high[idx] - low[idx] < weakest:
+                weakest = high[idx] - low[idx]
+            delta = value - mean[idx]
+            mean[idx] += delta / count
+            m2[idx] += delta * (value - mean[idx])
+            if count > 1:
+                change = value - prev[idx]
+                if -SWEEP_QUIET < change < SWEEP_QUIET:
+                    quiet[idx] += change * change
+                    quiet_count[idx] += 1
+            prev[idx] = value
+        self.sw_count = count
+        if weakest > self._sw_best + self._sw_best // SWEEP_GROWTH:
+            self._sw_best = weakest
+            self._sw_still = 0
+        else:
+            self._sw_still += 1
+    
+    def sweepConverged(self):
+        """
+        Return True once every sensor has seen both the line and the surface
+        and the contrast has stopped growing.
+        """
+        return (self._sw_best >= SWEEP_MIN_CONTRAST
+                and self._sw_still >= SWEEP_SETTLE)
+    
+    def getNoise(self):
+        """
+        Return each sensor's noise, the standard deviation in counts of a
+        reading which isn't moving over the line, from the sweep statistics.
+        Two readings' noise adds up in the change between them, so the mean
+        squared change between quiet readings is halved.
+        """
+        return [math.sqrt(self.sw_quiet[idx] / (2 * self.sw_quiet_count[idx]))
+                if self.sw_quiet_count[idx] else 0.0
+                for idx in range(len(self.sw_quiet))]
+    
+    def getVariance(self):
+        """
+        Return each sensor's variance in counts squared over the sweep.
+        """
+        return [m2 / self.sw_count if self.sw_count else 0.0
+                for m2 in self.sw_m2]
+    
+    def finishSweep(self):
+        """
+        Store dark and light calibration values from the sweep: the extremes
+        each sensor saw, moved in by twice its noise so that one noisy
+        reading doesn't stretch the span. Dark is taken to read high, as it
+        does on the QTR arrays.
+        Returns the (dark, light) calibration values.
+        """
+        noise = self.getNoise()
+        self.darkValue = [int(self.sw_max[idx] - 2 * noise[idx])
+                          for idx in range(len(noise))]
+        self.lightValue = [int(self.sw_min[idx] + 2 * noise[idx])
+                           for idx in range(len(noise))]
+        self._computeScales()
+        return self.darkValue, self.lightValue
+
     def enable(self):
         """
         Enable the IR sensors by setting control pins HIGH.
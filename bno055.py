@@ -7,9 +7,20 @@ Created on Wed Feb 26 11:22:55 2025
 
 Purpose: Provides a driver for the BNO055 sensor. This module enables:
          - Sensor initialization and mode configuration,
-         - Reading Euler angles (heading) and gyroscope data,
-         - Retrieving and setting calibration coefficients,
-         - Setting an offset for heading corrections, and
+         - Reading Euler angles (heading) and gyroscope data, separately or
+           together in one burst read into a preallocated buffer,
+         - Retrieving and setting calibration coefficients, and saving them to
+           and loading them from a profile file with a checksum, so a
+           calibration can be written during CONFIGMODE at start up,
+         - Starting fusion without blocking, so other hardware can be set up
+           while the sensor changes mode,
+         - Setting an offset for heading corrections,
+         - Optionally caching the latest sample, so that several readers in one
+           control cycle share a single I2C read,
+         - Filling the cache from a periodic read scheduled by an I2CBus
+           manager (i2c_bus.py), which splits each read into sending the
+           register address and reading the data in separate scheduler
+           slots, and
          - Computing the heading error relative to a target angle.
 """
 
@@ -17,6 +28,52 @@ Purpose: Provides a driver for the BNO055 sensor. This module enables:
 # Imports
 # ---------
 import pyb
+import micropython
+import time
+from array import array
+
+# Calibration profile file: magic, the 22 calibration bytes, then a 16 bit
+# Fletcher checksum of the calibration bytes
+PROFILE_MAGIC = b'B055'
+PROFILE_LEN = 4 + 22 + 2
+
+def _checksum(data):
+    """
+    Return the 16 bit Fletcher checksum of 'data'.
+    """
+    sum1 = 0
+    sum2 = 0
+    for value in data:
+        sum1 = (sum1 + value) % 255
+        sum2 = (sum2 + sum1) % 255
+    return (sum2 << 8) | sum1
+
+def load_profile(path):
+    """
+    Load the calibration coefficients saved in the profile file 'path'.
+    Returns the 22 bytes, or None if the file is missing or corrupt.
+    """
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+    except OSError:
+        return None
+    if len(data) != PROFILE_LEN or data[0:4] != PROFILE_MAGIC:
+        return None
+    coeffs = data[4:26]
+    if _checksum(coeffs) != data[26] | (data[27] << 8):
+        return None
+    return coeffs
+
+def save_profile(path, coeffs):
+    """
+    Save the 22 calibration bytes 'coeffs' to the profile file 'path'.
+    """
+    if len(coeffs) != 22:
+        raise ValueError("Calibration data must be 22 bytes long.")
+    check = _checksum(coeffs)
+    with open(path, 'wb') as file:
+        file.write(PROFILE_MAGIC + bytes(coeffs) + bytes((check & 0xFF, check >> 8)))
 
 # ---------------------------------
 # BNO055 Sensor Driver Class
@@ -29,31 +86,68 @@ class BNO055:
     EULER_DATA_ADDR = 0x1A  # Starting register for Euler angles (heading, roll, pitch)
     GYR_DATA_ADDR = 0x14    # Starting register for gyroscope data (angular velocity)
     CALIB_DATA_ADDR = 0x55  # Starting register for calibration coefficients
+    SAMPLE_ADDR = 0x14      # Gyroscope data followed by Euler angles
+    SAMPLE_LEN = 12         # Gyro x, y, z then heading, roll, pitch; 2 bytes each
 
     # Operating mode definitions (example values)
     CONFIGMODE = 0x00 
     NDOF_MODE = 0x0C  # 9DOF fusion mode
 
-    def __init__(self, i2c, address=0x28):
+    # Mode switching times from the datasheet, 19 ms into CONFIGMODE and
+    # 7 ms out of it, with some margin
+    CONFIG_SWITCH_MS = 25
+    FUSION_SWITCH_MS = 10
+
+    def __init__(self, i2c, address=0x28, max_age_us=0, cache_gyro=False,
+                 calibration=None, wait=True):
         """
-        Initialize the BNO055 sensor using a pyb.I2C object in CONTROLLER mode.
-        Default I2C address is typically 0x28 or 0x29.
+        Initialize the BNO055 sensor using a pyb.I2C object in CONTROLLER mode,
+        or an I2CBus manager. Default I2C address is typically 0x28 or 0x29.
+        If max_age_us is given, headings (and with cache_gyro, the yaw rate)
+        are served from the latest sample while it is younger than that, and
+        a new one is read only when it's older; see refresh(). With a bus
+        subscription filling the cache, reads of a sample older than that are
+        counted in stale_reads instead.
         Checks CHIP_ID to verify proper communication and sets up the sensor mode.
+        The 22 calibration bytes 'calibration', if given, are written while
+        the sensor is in CONFIGMODE, so fusion is calibrated from its first
+        sample. With wait=False, fusion is started without waiting for the
+        mode switch; call wait_ready() before reading the sensor.
+        The sensor supports 400 kHz fast mode I2C, which makes reads about
+        three times quicker than at 100 kHz.
         """
         self.i2c = i2c
         self.address = address
+        # Buffer for the gyro and Euler registers, and views of the parts
+        # read on their own, so reads allocate nothing
+        self._buf = bytearray(BNO055.SAMPLE_LEN)
+        self._gyro_buf = memoryview(self._buf)[0:6]
+        self._heading_buf = memoryview(self._buf)[6:8]
+        # Latest burst sample in raw signed units of 1/16 degree or 1/16
+        # degree per second: gyro x, y, z, heading, roll, pitch
+        self.sample = array('h', [0] * 6)
+        self.max_age_us = max_age_us
+        self.cache_gyro = cache_gyro
+        self.sample_time = 0     # time.ticks_us() when the cache was filled
+        self.sampled = False     # Whether the cache has been filled yet
+        self.subscription = None # I2CBus Subscription which fills the cache
+        self.stale_reads = 0     # Subscribed reads older than max_age_us
         # Optionally check CHIP_ID to ensure sensor communication.
         chip_id = self._read_register(BNO055.CHIP_ID)[0]
         expected_chip_id = 0xA0  # Replace with correct value from datasheet if needed.
         if chip_id != expected_chip_id:
             raise Exception("BNO055 not found (chip ID mismatch).")
-        # Set sensor to CONFIGMODE for configuration.
-        self.set_mode(BNO055.CONFIGMODE)
-        pyb.delay(20)
-        # Set sensor to NDOF_MODE for 9DOF fusion operation.
-        self.set_mode(BNO055.NDOF_MODE)
-        pyb.delay(30)
         self.offset = 0
+        # Set sensor to CONFIGMODE for configuration. It starts up in
+        # CONFIGMODE, in which case there's no switch to wait for.
+        self.mode = self._read_register(BNO055.OPR_MODE)[0]
+        self.ready_time = time.ticks_ms()
+        if self.mode != BNO055.CONFIGMODE:
+            self.set_mode(BNO055.CONFIGMODE)
+        if calibration is not None:
+            self.set_calibration_coefficients(calibration)
+        # Set sensor to NDOF_MODE for 9DOF fusion operation.
+        self.set_mode(BNO055.NDOF_MODE, wait)
 
     def _read_register(self, reg, nbytes=1):
         """
@@ -62,6 +156,12 @@ class BNO055:
         """
         return self.i2c.mem_read(nbytes, self.address, reg)
     
+    def _read_into(self, buf, reg):
+        """
+        Read into 'buf' starting from register 'reg', without allocating.
+        """
+        self.i2c.mem_read(buf, self.address, reg)
+    
     def _write_register(self, reg, data):
         """
         Write data to the specified register 'reg'.
@@ -69,14 +169,37 @@ class BNO055:
         """
         self.i2c.mem_write(data, self.address, reg)
     
-    def set_mode(self, mode):
+    def set_mode(self, mode, wait=True):
         """
         Change the operating mode of the sensor.
         For fusion mode changes, refer to the datasheet for correct mode values.
+        Waits for any earlier mode change to finish first. With wait=False,
+        returns without waiting for this one; see wait_ready().
         """
+        self.wait_ready()
         self._write_register(BNO055.OPR_MODE, mode)
-        # Allow time for the mode change to take effect.
-        pyb.delay(30)
+        self.mode = mode
+        if mode == BNO055.CONFIGMODE:
+            switch_ms = BNO055.CONFIG_SWITCH_MS
+        else:
+            switch_ms = BNO055.FUSION_SWITCH_MS
+        self.ready_time = time.ticks_add(time.ticks_ms(), switch_ms)
+        if wait:
+            self.wait_ready()
+    
+    def is_ready(self):
+        """
+        Return True once the last mode change has taken effect.
+        """
+        return time.ticks_diff(self.ready_time, time.ticks_ms()) <= 0
+    
+    def wait_ready(self):
+        """
+        Wait until the last mode change has taken effect.
+        """
+        remaining = time.ticks_diff(self.ready_time, time.ticks_ms())
+        if remaining > 0:
+            pyb.delay(remaining)
     
     def get_calibration_status(self):
         """
@@ -115,13 +238,37 @@ class BNO055:
             raise ValueError("Calibration data must be 22 bytes long.")
         self._write_register(BNO055.CALIB_DATA_ADDR, coeffs)
     
+    def is_calibrated(self):
+        """
+        Return True if the system calibration status is fully calibrated.
+        """
+        return self.get_calibration_status()["sys"] == 3
+    
+    def save_calibration(self, path):
+        """
+        Save the sensor's calibration coefficients to the profile file 'path',
+        for loading with load_profile() at the next start up. The sensor only
+        gives its calibration in CONFIGMODE, so fusion is stopped while it's
+        read. The file is only written if the coefficients have changed, to
+        spare the flash. Returns True if it was written.
+        """
+        mode = self.mode
+        self.set_mode(BNO055.CONFIGMODE)
+        coeffs = self.get_calibration_coefficients()
+        self.set_mode(mode)
+        if load_profile(path) == coeffs:
+            return False
+        save_profile(path, coeffs)
+        return True
+    
     def read_euler_angles(self):
         """
         Read Euler angles (heading, roll, pitch) from the sensor.
         Returns the heading as a float (degrees).
         Note: Only heading is computed; roll and pitch are commented.
         """
-        data = self._read_register(BNO055.EULER_DATA_ADDR, 2) #Change to 5 if need more
+        data = self._heading_buf
+        self._read_into(data, BNO055.EULER_DATA_ADDR)
         # Convert raw bytes to heading (assuming little-endian, scale factor = 1/16)
         heading = (data[0] | (data[1] << 8)) / 16.0
         # roll  = (data[2] | (data[3] << 8)) / 16.0  # Uncomment if needed.
@@ -132,29 +279,149 @@ class BNO055:
         """
         Read gyroscope data (angular velocity) from the sensor.
         Returns a tuple (x, y, z) representing angular velocity (degrees per second).
-        Uses an example scale factor; verify with the datasheet.
+        The registers hold signed values at 16 LSB per degree per second.
         """
-        data = self._read_register(BNO055.GYR_DATA_ADDR, 6)
-        scale = 16.0  # Example scale factor; confirm with datasheet.
-        x = (data[0] | (data[1] << 8)) / scale
-        y = (data[2] | (data[3] << 8)) / scale
-        z = (data[4] | (data[5] << 8)) / scale
-        return (x, y, z)
+        self._read_into(self._gyro_buf, BNO055.GYR_DATA_ADDR)
+        self._decode(0, 3)
+        sample = self.sample
+        return (sample[0] / 16.0, sample[1] / 16.0, sample[2] / 16.0)
+    
+    def read_sample(self):
+        """
+        Read the gyroscope and Euler angle registers together in one I2C
+        transaction, into the preallocated buffer, and decode them into
+        self.sample. Returns self.sample: gyro x, y, z in 1/16 degree per
+        second, then heading, roll, pitch in 1/16 degree.
+        """
+        self._read_into(self._buf, BNO055.SAMPLE_ADDR)
+        self._decode(0, 6)
+        self.sample_time = time.ticks_us()
+        self.sampled = True
+        return self.sample
+    
+    def subscribe(self, bus, period_ms):
+        """
+        Have the I2CBus manager 'bus' read the heading, or the whole sample
+        with cache_gyro set, into the cache every 'period_ms' milliseconds.
+        From then on, refresh() and the heading methods are served from the
+        cache and never read the sensor themselves: a read of their own
+        would hold up the calling task, and would make the bus start a read
+        it had begun again. If the bus falls behind, reads of a sample older
+        than max_age_us are counted in stale_reads. Returns the bus
+        Subscription.
+        """
+        if self.cache_gyro:
+            self.subscription = bus.subscribe(self.address, BNO055.SAMPLE_ADDR,
+                                              BNO055.SAMPLE_LEN, period_ms,
+                                              self._on_sample)
+        else:
+            self.subscription = bus.subscribe(self.address,
+                                              BNO055.EULER_DATA_ADDR, 2,
+                                              period_ms, self._on_sample)
+        return self.subscription
+    
+    def _on_sample(self, data):
+        """
+        Bus callback: copy the heading or whole sample in 'data' into the
+        cache and decode it.
+        """
+        if len(data) == BNO055.SAMPLE_LEN:
+            self._buf[:] = data
+            self._decode(0, 6)
+        else:
+            self._heading_buf[:] = data
+            self._decode(3, 1)
+        self.sample_time = time.ticks_us()
+        self.sampled = True
+    
+    def refresh(self):
+        """
+        Make sure the cached sample is no older than max_age_us, reading the
+        sensor only if it is. Only the heading is read unless cache_gyro was
+        set, as two bytes take much less bus time than the whole sample. A
+        task which owns the IMU can call this once per control cycle, so
+        that other readers in the cycle are served from the cache. Once the
+        cache is filled by a bus subscription, nothing is read here, and a
+        sample older than max_age_us is counted in stale_reads.
+        Returns self.sample.
+        """
+        if self.subscription is not None:
+            self._check_age()
+            return self.sample
+        if (not self.sampled or time.ticks_diff(time.ticks_us(), self.sample_time)
+                > self.max_age_us):
+            if self.cache_gyro:
+                self.read_sample()
+            else:
+                self._read_into(self._heading_buf, BNO055.EULER_DATA_ADDR)
+                self._decode(3, 1)
+                self.sample_time = time.ticks_us()
+                self.sampled = True
+        return self.sample
+    
+    @micropython.native
+    def _decode(self, first, count):
+        """
+        Decode 'count' little-endian signed 16-bit values of the buffer,
+        starting with value 'first', into the same places of self.sample.
+        """
+        buf = self._buf
+        sample = self.sample
+        for idx in range(first, first + count):
+            value = buf[2 * idx] | (buf[2 * idx + 1] << 8)
+            if value & 0x8000:
+                value -= 0x10000
+            sample[idx] = value
+    
+    def get_heading(self):
+        """
+        Return the heading in degrees from the latest read_sample(),
+        refresh() or subscribed read.
+        """
+        if self.subscription is not None:
+            self._check_age()
+        return self.sample[3] / 16.0
+    
+    def _check_age(self):
+        """
+        Count a read of the subscribed cache in stale_reads if it hasn't been
+        filled yet or its sample is older than max_age_us.
+        """
+        if self.max_age_us and (not self.sampled or time.ticks_diff(
+                time.ticks_us(), self.sample_time) > self.max_age_us):
+            self.stale_reads += 1
+    
+    def get_yaw_rate(self):
+        """
+        Return the z axis angular velocity in degrees per second from the
+        latest read_sample(), or from refresh() with cache_gyro set.
+        """
+        return self.sample[2] / 16.0
     
     def set_offset(self):
         """
         Set the current heading as the offset.
         This offset is used to correct future heading readings.
         """
-        heading = self.read_euler_angles()
+        heading = self._current_heading()
         self.offset = heading
         
+    def _current_heading(self):
+        """
+        Return the heading in degrees, from the cache if caching is on or a
+        bus subscription fills it.
+        """
+        if self.max_age_us or self.subscription is not None:
+            self.refresh()
+            return self.sample[3] / 16.0
+        return self.read_euler_angles()
+        
     def get_corrected_heading(self):
         """
         Return the current heading adjusted by the previously set offset.
         The result is normalized to a 0-359° range.
         """
-        raw_heading = self.read_euler_angles()
+        raw_heading = self._current_heading()
         corrected_heading = (raw_heading - self.offset + 360) % 360
         return corrected_heading
     
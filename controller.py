@@ -34,12 +34,25 @@ class Controller:
         self.actuation_effor = 0          # (Not used in current implementation)
         self.dt = dt                      # Time step for integration and differentiation
         self.prev_time = 0                # To record previous time stamp for dt update
+        self.stamp = 0                    # Time the latest measured value was sampled
     
-    def updateMeasured(self, measured_val):
+    def updateMeasured(self, measured_val, stamp=None):
         """
         Update the current measured value.
+        Optional parameters:
+            stamp: time.ticks_us() time at which the value was sampled. It is
+                   kept with the value so the age of the control action can
+                   be measured when it is applied; see getStamp().
         """
         self.measured = measured_val
+        if stamp is not None:
+            self.stamp = stamp
+    
+    def getStamp(self):
+        """
+        Return the sample time of the measured value that totalAction() acts on.
+        """
+        return self.stamp
         
     def updateReference(self, reference_val):
         """
@@ -27,9 +27,222 @@
 #  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 #  POSSIBILITY OF SUCH DAMAGE.
 
-import gc                              # Memory allocation garbage collector
+import array                           # Compact tables for cyclic scheduling
 import utime                           # Micropython version of time library
+import pyb                             # Used to sleep the CPU when idle
 import micropython                     # This shuts up incorrect warnings
+import heapq                           # Priority queues for EDF scheduling
+
+
+## How far, in microseconds, the EDF scheduler lets time run past its base
+#  time before moving the base up. This keeps heap keys well inside the range
+#  of @c utime.ticks_diff() as the tick counter wraps.
+EDF_REBASE_US = micropython.const(1 << 28)
+
+## Overrun policy: a task released more than a period late makes up every
+#  missed release by running back to back until it's caught up.
+CATCH_UP = micropython.const(0)
+
+## Overrun policy: a task released more than a period late runs once, then
+#  skips the releases it missed and goes on in its original phase.
+SKIP = micropython.const(1)
+
+## Overrun policy: a task released more than a period late runs once, then
+#  goes on with its next release one period from now.
+REPHASE = micropython.const(2)
+
+## The number of transitions kept in a task's trace when tracing is turned on
+#  with @c trace=True rather than with a number of transitions.
+TRACE_DEPTH = micropython.const(256)
+
+## The number of bins in a task's run time and lateness histograms. Values
+#  beyond the last bin are counted in the last bin.
+HIST_BINS = micropython.const(16)
+
+## How close to a task release, in microseconds, the hardware clock stops
+#  sleeping. The CPU is woken at least once a millisecond by the system tick
+#  interrupt, so sleeping stops a millisecond early and the rest is spun.
+SLEEP_MARGIN_US = micropython.const(1000)
+
+## The period of the MicroPython microsecond tick counter, at which virtual
+#  clocks wrap as well
+TICKS_PERIOD = micropython.const(1 << 30)
+
+## The largest number of time slots allowed in a cyclic executive table. Task
+#  periods with a small common divisor and a long least common multiple need
+#  very long tables; those task sets should use another scheduler.
+MAX_TABLE_SLOTS = micropython.const(20000)
+
+
+## A clock source which reads the microcontroller's microsecond tick counter.
+#
+#  Tasks and task lists get the time through a clock source object so that
+#  the scheduler can be run against something other than the hardware timer.
+#  This is the default source. Its methods are the @c utime functions
+#  themselves, so using it costs nothing over calling @c utime directly.
+class TicksClock:
+
+    ## @c True for clocks whose time can be jumped forward while idle
+    virtual = False
+
+    ## Return the current time in microseconds.
+    ticks = staticmethod(utime.ticks_us)
+
+    ## Return the signed difference @c a - @c b between two times.
+    diff = staticmethod(utime.ticks_diff)
+
+    ## Return time @c t offset by @c delta microseconds.
+    add = staticmethod(utime.ticks_add)
+
+    ## Called by the scheduler when no task is ready, the earliest one is due
+    #  at time @c until, and the task list has low-power idle turned on.
+    #  Unless the release is near, the CPU sleeps with @c pyb.wfi() until an
+    #  interrupt wakes it, which the system tick does every millisecond. The
+    #  scheduler then looks again, so tasks started by an interrupt service
+    #  routine are run as soon as it returns.
+    #  @param until The time at which the next task will be ready
+    def idle(self, until):
+        if utime.ticks_diff(until, utime.ticks_us()) > SLEEP_MARGIN_US:
+            pyb.wfi()
+
+
+## A clock source whose time only moves when it is told to.
+#
+#  When no task is ready to run, the scheduler jumps a virtual clock straight
+#  to the next task's release time rather than spinning until it arrives.
+#  Runs are therefore deterministic and take no longer than the task code
+#  itself. Task code (or a test harness) can call @c advance() to model how
+#  long a task takes, which makes lateness and overrun scenarios exactly
+#  reproducible. The ticks wrap with the same period as the hardware tick
+#  counter, so long runs exercise the wraparound handling and timestamps fit
+#  the same arrays; @c now holds the time without wrapping.
+#
+#  @b Example:
+#    @code
+#       clock = cotask.VirtualClock ()
+#       cotask.set_clock (clock)
+#       # ...create tasks, some of which call clock.advance (run_time_us)...
+#       while clock.now < 10000000:
+#           cotask.task_list.pri_sched ()
+#       print (cotask.task_list)
+#    @endcode
+class VirtualClock:
+
+    ## @c True for clocks whose time can be jumped forward while idle
+    virtual = True
+
+    ## Create a virtual clock.
+    #  @param start The initial time in microseconds
+    def __init__(self, start=0):
+        ## The current time in microseconds, which doesn't wrap
+        self.now = start
+
+    ## Return the current time in microseconds, wrapped to @c TICKS_PERIOD.
+    def ticks(self):
+        return self.now & (TICKS_PERIOD - 1)
+
+    ## Return the signed difference @c a - @c b between two times.
+    def diff(self, a, b):
+        half = TICKS_PERIOD // 2
+        return ((a - b + half) & (TICKS_PERIOD - 1)) - half
+
+    ## Return time @c t offset by @c delta microseconds.
+    def add(self, t, delta):
+        return (t + delta) & (TICKS_PERIOD - 1)
+
+    ## Move time forward, as if the CPU had been busy for a while.
+    #  @param us The number of microseconds to advance the clock
+    def advance(self, us):
+        self.now += us
+
+    ## Jump to the next task release instead of waiting for it.
+    #  @param until The time at which the next task will be ready
+    def idle(self, until):
+        wait = self.diff(until, self.ticks())
+        if wait > 0:
+            self.now += wait
+
+
+## A histogram of times, with a fixed number of equally wide bins.
+#
+#  The bin counts are kept in a preallocated array and the total and maximum
+#  in integers, so adding a value allocates no memory. Tasks use histograms
+#  to profile their run times and lateness, which means profiling can be left
+#  on without causing garbage collection pauses.
+class Histogram:
+
+    ## Create a histogram.
+    #  @param bins The number of bins. The last bin also counts every value
+    #         too large for the other bins.
+    #  @param width The width of each bin in microseconds
+    def __init__(self, bins=HIST_BINS, width=100):
+        ## The width of each bin in microseconds
+        self.width = max(1, int(width))
+
+        ## The number of values counted in each bin
+        self.counts = array.array('L', [0] * bins)
+        self.reset()
+
+    ## Forget all the values counted so far.
+    def reset(self):
+        for idx in range(len(self.counts)):
+            self.counts[idx] = 0
+
+        ## The number of values added
+        self.count = 0
+
+        ## The sum of the values added
+        self.total = 0
+
+        ## The largest value added
+        self.max = 0
+
+    ## Count a value in the histogram. Negative values count as zero.
+    #  @param value The value, in microseconds, to be counted
+    @micropython.native
+    def add(self, value: int):
+        if value < 0:
+            value = 0
+        idx = value // self.width
+        if idx >= len(self.counts):
+            idx = len(self.counts) - 1
+        self.counts[idx] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    ## Return the mean of the values added, or zero if there are none.
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    ## Return a value which at least the given fraction of the values added
+    #  don't exceed: the top of the bin in which that fraction is reached,
+    #  or the maximum if it's in the last bin.
+    #  @param frac The fraction, such as 0.99 for the 99th percentile
+    def percentile(self, frac):
+        need = frac * self.count
+        seen = 0
+        for idx in range(len(self.counts) - 1):
+            seen += self.counts[idx]
+            if seen >= need:
+                return min(self.max, (idx + 1) * self.width)
+        return self.max
+
+    ## Show the histogram as one line per bin, in milliseconds.
+    def __repr__(self):
+        rst = ''
+        most = max(self.counts)
+        for idx in range(len(self.counts)):
+            count = self.counts[idx]
+            bar = '#' * (count * 40 // most) if most else ''
+            edge = idx * self.width / 1000.0
+            if idx < len(self.counts) - 1:
+                rst += f"{edge: 8.3f} -{edge + self.width / 1000.0: 8.3f}"
+            else:
+                rst += f"{edge: 8.3f} -      up"
+            rst += f" ms{count: 9d} {bar}\n"
+        return rst
 
 
 ## Implements multitasking with scheduling and some performance logging.
@@ -81,12 +294,22 @@ class Task:
     #         The time can be given in a @c float or @c int; it will be 
     #         converted to microseconds for internal use by the scheduler.
     #  @param profile Set to @c True to enable run-time profiling 
-    #  @param trace Set to @c True to generate a list of transitions between
-    #         states. @b Note: This slows things down and allocates memory.
+    #  @param trace Set to @c True to record transitions between states, or
+    #         to the number of the most recent transitions to be kept
+    #         (@c TRACE_DEPTH if @c True). The buffers are allocated here.
     #  @param shares A list or tuple of shares and queues used by this task.
     #         If no list is given, no shares are passed to the task
+    #  @param clock The clock source used to time this task, by default the
+    #         one set with @c set_clock() (normally the hardware ticks)
+    #  @param overrun What to do when the task is released more than one
+    #         period late: @c CATCH_UP (the default), @c SKIP or @c REPHASE
+    #  @param hist_width The width in microseconds of the run time histogram
+    #         bins, and half that of the lateness histogram bins. By default
+    #         the histograms span half a period and one period respectively,
+    #         or 1.6 ms each for tasks without a period
     def __init__(self, run_fun, name="NoName", priority=0, period=None,
-                 profile=False, trace=False, shares=()):
+                 profile=False, trace=False, shares=(), clock=None,
+                 overrun=CATCH_UP, hist_width=None):
         # The function which is run to implement this task's code. Since it 
         # is a generator, we "run" it here, which doesn't actually run it but
         # gets it going as a generator which is ready to yield values
@@ -102,6 +325,12 @@ class Task:
         #  priority. 
         self.priority = int(priority)
 
+        # The clock source; its functions are looked up once here so that
+        # timing the task costs the same as calling utime directly
+        self._clock = clock if clock is not None else default_clock
+        self._ticks = self._clock.ticks
+        self._diff = self._clock.diff
+
         ## The period, in milliseconds, between runs of the task's @c run()
         #  method. If the period is @c None, the @c run() method won't be run
         #  on a time basis but will instead be run by the scheduler as soon
@@ -109,30 +338,69 @@ class Task:
         #  @c go() method. 
         if period != None:
             self.period = int(period * 1000)
-            self._next_run = utime.ticks_us() + self.period
+            self._released = self._ticks()
+            self._next_run = self._clock.add(self._released, self.period)
         else:
             self.period = period
             self._next_run = None
 
+        ## The overrun policy, which says how a timed task deals with
+        #  releases it missed by running more than a period late
+        self.overrun = overrun
+
         # Flag which causes the task to be profiled, in which the execution
         #  time of the @c run() method is measured and basic statistics kept. 
         self._prof = profile
+        if hist_width is None:
+            if self.period != None:
+                hist_width = self.period // (2 * HIST_BINS)
+            else:
+                hist_width = 100
+
+        ## Histogram of the task's run times, kept when profiling
+        self.run_hist = Histogram(HIST_BINS, hist_width)
+
+        ## Histogram of how late the task's releases were run, kept when
+        #  profiling a task with a period
+        self.late_hist = Histogram(HIST_BINS, 2 * hist_width)
         self.reset_profile()
 
         # The previous state in which the task last ran. It is used to watch
         # for and track state transitions.
         self._prev_state = 0
 
-        # If transition tracing has been enabled, create an empty list in 
-        # which to store transition (time, to-state) stamps
-        self._trace = trace
-        self._tr_data = []
-        self._prev_time = utime.ticks_us()
+        # If transition tracing has been enabled, create ring buffers in
+        # which to store transition times and to-states. The oldest entries
+        # are overwritten once the buffers are full
+        self._trace = bool(trace)
+        depth = TRACE_DEPTH if trace is True else int(trace)
+        self._tr_time = array.array('L', [0] * depth)
+        self._tr_state = array.array('l', [0] * depth)
+        self._tr_next = 0
+        self._tr_count = 0
+        self._tr_start = self._ticks()
 
         ## Flag which is set true when the task is ready to be run by the
         #  scheduler
         self.go_flag = False
 
+        ## The percentage of CPU time used by this task during the task
+        #  list's last load measurement window
+        self.load = 0.0
+
+        # Time spent running so far in the current load measurement window
+        self._busy = 0
+
+        # The task list holding this task and the task's number in it, which
+        # are used by go() to put the task in the list's ready queue
+        self._list = None
+        self._idx = 0
+
+        # Tasks which use this task's output and are run right after it, and
+        # whether they're held back after this run by hold()
+        self._consumers = ()
+        self._held = False
+
 
     ## This method is called by the scheduler; it attempts to run this task.
     #  If the task is not yet ready to run, this method returns @c False
@@ -142,52 +410,107 @@ class Task:
     #  @return @c True if the task ran or @c False if it did not
     def schedule(self) -> bool:
         if self.ready():
-
-            # Reset the go flag for the next run
-            self.go_flag = False
-
-            # If profiling, save the start time
-            if self._prof:
-                stime = utime.ticks_us()
-
-            # Run the method belonging to the state which should be run next
-            curr_state = next(self._run_gen)
-
-            # If profiling or tracing, save timing data
-            if self._prof or self._trace:
-                etime = utime.ticks_us()
-
-            # If profiling, save timing data
-            if self._prof:
-                self._runs += 1
-                runt = utime.ticks_diff(etime, stime)
-                if self._runs > 2:
-                    self._run_sum += runt
-                    if runt > self._slowest:
-                        self._slowest = runt
-
-            # If transition logic tracing is on, record a transition; if not,
-            # ignore the state. If out of memory, switch tracing off and 
-            # run the memory allocation garbage collector
-            if self._trace:
-                try:
-                    if curr_state != self._prev_state:
-                        self._tr_data.append(
-                            (utime.ticks_diff(etime, self._prev_time),
-                             curr_state))
-                except MemoryError:
-                    self._trace = False
-                    gc.collect()
-
-                self._prev_state = curr_state
-                self._prev_time = etime
-
+            self.run()
             return True
-
         else:
             return False
 
 
+    ## This method runs the task's generator up to the next @c yield()
+    #  without checking whether the task is ready. It's called by
+    #  @c schedule() and by schedulers which decide for themselves when
+    #  tasks are to run, such as the cyclic executive. Afterwards, any tasks
+    #  declared with @c feeds() are run in turn, unless this task called
+    #  @c go() or @c hold() on itself because it isn't finished yet.
+    def run(self):
+        # Reset the go and hold flags for the next run
+        self.go_flag = False
+        self._held = False
+
+        # Save the start time, which is used for the load meter and profile
+        stime = self._ticks()
+
+        # Run the method belonging to the state which should be run next
+        curr_state = next(self._run_gen)
+
+        # A timed task's deadline is one period after its release; finishing
+        # after that counts as a deadline miss
+        etime = self._ticks()
+        self._busy += self._diff(etime, stime)
+
+        # Close the task list's load window once it's over. It's also closed
+        # when the CPU idles, but an overloaded CPU never does
+        tasks = self._list
+        if (tasks is not None
+                and self._diff(etime, tasks._win_start) >= tasks.load_window):
+            tasks._end_window(etime)
+        if (self.period != None
+                and self._diff(etime, self._released) > self.period):
+            self._dl_misses += 1
+
+        # If profiling, save timing data. The response time runs from
+        # the nominal release time to the end of this run
+        if self._prof:
+            self._runs += 1
+            if self._runs > 2:
+                self.run_hist.add(self._diff(etime, stime))
+                if self.period != None:
+                    resp = self._diff(etime, self._released)
+                    if resp > self._worst_resp:
+                        self._worst_resp = resp
+
+        # If transition logic tracing is on, record a transition in the
+        # trace buffers; if not, ignore the state
+        if self._trace:
+            if curr_state != self._prev_state:
+                idx = self._tr_next
+                self._tr_time[idx] = etime
+                self._tr_state[idx] = curr_state
+                idx += 1
+                self._tr_next = idx if idx < len(self._tr_time) else 0
+                self._tr_count += 1
+            self._prev_state = curr_state
+
+        # Run the tasks which use this task's output, so new data goes down
+        # the pipeline in one scheduler pass. A task which has set its own go
+        # flag again, or held its consumers, is waiting for something and has
+        # no new output yet
+        if not self.go_flag and not self._held:
+            for task in self._consumers:
+                task.run()
+
+
+    ## Declare tasks which consume this task's output.
+    #
+    #  Each time this task runs, the given tasks are run right after it, in
+    #  order, within the same scheduler pass. Chaining tasks this way, such
+    #  as a sensor task feeding a controller feeding the motor outputs, makes
+    #  the delay from sensing to actuation the sum of the tasks' run times
+    #  rather than of their periods. Consumers usually have no period of
+    #  their own, being run only by their producer; they may in turn feed
+    #  other tasks, but a pipeline must not loop back on itself. A producer
+    #  which must wait partway through its work, such as for a sensor to
+    #  settle, can call @c go() on itself and yield, to be run again at once,
+    #  or call @c hold() and yield, to be run again when something such as a
+    #  timer interrupt calls @c go(). Its consumers then run after the run in
+    #  which it finishes.
+    #  @param tasks The tasks to be run after this one
+    def feeds(self, *tasks):
+        for task in tasks:
+            if task is self or self in task._pipeline():
+                raise ValueError(f"Task {task.name} would loop the pipeline")
+        self._consumers += tasks
+
+
+    ## Return a list of this task and every task it feeds, directly or
+    #  through other tasks.
+    def _pipeline(self):
+        found = [self]
+        for task in self._consumers:
+            found += task._pipeline()
+        return found
+
+
     ## This method checks if the task is ready to run.
     #  If the task runs on a timer, this method checks what time it is; if not,
     #  this method checks the flag which indicates that the task is ready to
@@ -198,17 +521,30 @@ class Task:
         # If this task uses a timer, check if it's time to run run() again. If
         # so, set go flag and set the timer to go off at the next run time
         if self.period != None:
-            late = utime.ticks_diff(utime.ticks_us(), self._next_run)
-            if late > 0:
+            now = self._ticks()
+            late = self._diff(now, self._next_run)
+            if late >= 0:
                 self.go_flag = True
-                self._next_run = utime.ticks_diff(self.period, 
-                                                  -self._next_run)
+                self._released = self._next_run
+                self._next_run = self._diff(self.period, -self._next_run)
+
+                # If a whole period or more late, releases have been missed.
+                # Count them and, unless catching up, drop them
+                if late >= self.period:
+                    if self.overrun == CATCH_UP:
+                        self._missed += 1
+                    else:
+                        missed = late // self.period
+                        self._missed += missed
+                        if self.overrun == SKIP:
+                            self._next_run = self._diff(
+                                missed * self.period, -self._next_run)
+                        else:
+                            self._next_run = self._diff(self.period, -now)
 
                 # If keeping a latency profile, record the data
                 if self._prof:
-                    self._late_sum += late
-                    if late > self._latest:
-                        self._latest = late
+                    self.late_hist.add(late)
 
         # If the task doesn't use a timer, we rely on go_flag to signal ready
         return self.go_flag
@@ -229,37 +565,82 @@ class Task:
     #  This method is also used by @c __init__() to create the variables.
     def reset_profile(self):
         self._runs = 0
-        self._run_sum = 0
-        self._slowest = 0
-        self._late_sum = 0
-        self._latest = 0
+        self._dl_misses = 0
+        self._missed = 0
+        self._worst_resp = 0
+        self.run_hist.reset()
+        self.late_hist.reset()
 
 
     ## This method returns a string containing the task's transition trace.
-    #  The trace is a set of tuples, each of which contains a time and the
-    #  states from and to which the system transitioned. 
+    #  The trace shows the most recent transitions kept in the trace buffers,
+    #  each with the time since the task was created and the states from and
+    #  to which the system transitioned. If older transitions have been
+    #  overwritten, the oldest one kept only supplies the first from-state.
     #  @return A possibly quite large string showing state transitions
     def get_trace(self):
         tr_str = 'Task ' + self.name + ':'
         if self._trace:
             tr_str += '\n'
+            depth = len(self._tr_time)
             last_state = 0
-            total_time = 0.0
-            for item in self._tr_data:
-                total_time += item[0] / 1000000.0
-                tr_str += '{: 12.6f}: {: 2d} -> {:d}\n'.format (total_time, 
-                    last_state, item[1])
-                last_state = item[1]
+            kept = self._tr_count
+            idx = 0
+            if kept > depth:
+                tr_str += f'  ({kept - depth + 1} earlier transitions lost)\n'
+                idx = self._tr_next
+                last_state = self._tr_state[idx]
+                idx = (idx + 1) % depth
+                kept = depth - 1
+            for _ in range(kept):
+                tr_time = self._diff(self._tr_time[idx], self._tr_start)
+                tr_str += '{: 12.6f}: {: 2d} -> {:d}\n'.format (
+                    tr_time / 1000000.0, last_state, self._tr_state[idx])
+                last_state = self._tr_state[idx]
+                idx = (idx + 1) % depth
         else:
             tr_str += ' not traced'
         return tr_str
 
 
+    ## This method returns a string showing the task's run time and lateness
+    #  histograms, which are kept when the task is profiled.
+    #  @return A string with one line per histogram bin
+    def get_profile(self):
+        prof_str = 'Task ' + self.name + ':'
+        if self._prof:
+            prof_str += '\n Run time\n' + str(self.run_hist)
+            if self.period != None:
+                prof_str += ' Lateness\n' + str(self.late_hist)
+        else:
+            prof_str += ' not profiled'
+        return prof_str
+
+
     ## Method to set a flag so that this task indicates that it's ready to run.
     #  This method may be called from an interrupt service routine or from
     #  another task which has data that this task needs to process soon.
-    def go(self):
-        self.go_flag = True
+    #  The task is also put in its task list's ready queue, so schedulers
+    #  which use the queue run it without having to check every task. Tasks
+    #  without a period run only when started this way; tasks with one run
+    #  at once as well as at their usual times. Nothing is allocated, so
+    #  this is safe to call from an interrupt service routine.
+    #  @param in_ISR Set this to @c True if calling from within an ISR
+    @micropython.native
+    def go(self, in_ISR=False):
+        if not self.go_flag:
+            self.go_flag = True
+            if self._list is not None:
+                self._list._wake(self._idx, in_ISR)
+
+
+    ## Keep the tasks this task feeds from being run after its current run,
+    #  because it is partway through its work. Unlike calling @c go() on
+    #  itself, this doesn't make the task ready again; something else, such
+    #  as an interrupt service routine, must call @c go() when the task can
+    #  go on. Called by the task's own code.
+    def hold(self):
+        self._held = True
 
 
     ## This method converts the task to a string for diagnostic use.
@@ -272,14 +653,16 @@ class Task:
             rst += f"{(self.period / 1000.0): 10.1f}"
         except TypeError:
             rst += '         -'
-        rst += f"{self._runs: 8d}"
+        rst += f"{self._runs: 8d}{self._dl_misses: 8d}{self._missed: 8d}"
+        rst += f"{self.load: 8.1f}"
 
         if self._prof and self._runs > 0:
-            avg_dur = (self._run_sum / self._runs) / 1000.0
-            avg_late = (self._late_sum / self._runs) / 1000.0
-            rst += f"{avg_dur: 10.3f}{(self._slowest / 1000.0): 10.3f}"
+            run, late = self.run_hist, self.late_hist
+            rst += f"{(run.mean() / 1000.0): 10.3f}{(run.max / 1000.0): 10.3f}"
             if self.period != None:
-                rst += f"{avg_late: 10.3f}{(self._latest / 1000.0): 10.3f}"
+                rst += f"{(late.mean() / 1000.0): 10.3f}"
+                rst += f"{(late.max / 1000.0): 10.3f}"
+                rst += f"{(self._worst_resp / 1000.0): 10.3f}"
         return rst
 
 
@@ -300,7 +683,33 @@ class TaskList:
 
     ## Initialize the task list. This creates the list of priorities in
     #  which tasks will be organized by priority.
-    def __init__(self):
+    #  @param clock The clock source used by the schedulers, by default the
+    #         one set with @c set_clock() (normally the hardware ticks)
+    #  @param load_window The length in milliseconds of the windows over
+    #         which CPU load is measured
+    #  @param sleep_min The shortest time in milliseconds until the next
+    #         task release for which the CPU is put to sleep, or @c None
+    #         (the default) to never sleep
+    def __init__(self, clock=None, load_window=1000, sleep_min=None):
+
+        ## The clock source. If it is virtual, the schedulers jump it to the
+        #  next task release whenever no task is ready to run.
+        self.clock = clock if clock is not None else default_clock
+
+        ## The length of a load measurement window in microseconds
+        self.load_window = int(load_window * 1000)
+
+        ## The percentage of CPU time spent running tasks during the last
+        #  load measurement window. The rest was spent in the scheduler,
+        #  waiting or sleeping.
+        self.load = 0.0
+
+        ## The shortest wait in microseconds for which the CPU is put to
+        #  sleep, or @c None if it should never sleep
+        self.sleep_min_us = None if sleep_min is None else int(sleep_min * 1000)
+
+        # Start of the current load measurement window
+        self._win_start = self.clock.ticks()
 
         ## The list of priority lists. Each priority for which at least one 
         #  task has been created has a list whose first element is a task 
@@ -308,6 +717,23 @@ class TaskList:
         #  that priority. 
         self.pri_list = []
 
+        # Heaps used by the EDF scheduler, built when it's first run
+        self._edf_waiting = None
+
+        ## The cyclic executive's schedule table, a tuple (tick, slot starts,
+        #  slot task indices, tasks), built by @c build_table() or when
+        #  @c cyc_sched() is first run
+        self.table = None
+
+        # Every task, in the order added, and the ready queue of the numbers
+        # of tasks started by go(). The queue is a ring buffer with room for
+        # every task; go() only queues a task which wasn't already ready, so
+        # it can't overflow
+        self._tasks = []
+        self._rq = array.array('B')
+        self._rq_head = 0
+        self._rq_count = 0
+
 
     ## Append a task to the task list. The list will be sorted by task 
     #  priorities so that the scheduler can quickly find the highest priority
@@ -333,6 +759,74 @@ class TaskList:
         # Make sure the main list (of lists at each priority) is sorted
         self.pri_list.sort(key=lambda pri: pri[0], reverse=True)
 
+        # Number the task and make room for it in the ready queue. The ring
+        # grows by one, so the tasks already queued are moved to its start
+        # to keep them in order
+        task._list = self
+        task._idx = len(self._tasks)
+        self._tasks.append(task)
+        irq_state = pyb.disable_irq()
+        size = len(self._rq)
+        queued = [self._rq[(self._rq_head + num) % size]
+                  for num in range(self._rq_count)]
+        self._rq.append(0)
+        for num in range(len(queued)):
+            self._rq[num] = queued[num]
+        self._rq_head = 0
+        pyb.enable_irq(irq_state)
+        if task.go_flag:
+            self._wake(task._idx)
+
+        # The EDF heaps and the cyclic table no longer hold every task, so
+        # they must be rebuilt
+        self._edf_waiting = None
+        self.table = None
+
+
+    ## Put a task in the ready queue. This is called by @c Task.go().
+    #  @param idx The task's number in this task list
+    #  @param in_ISR Set this to @c True if calling from within an ISR
+    @micropython.native
+    def _wake(self, idx: int, in_ISR=False):
+        if not in_ISR:
+            irq_state = pyb.disable_irq()
+        size = len(self._rq)
+        if self._rq_count < size:
+            pos = self._rq_head + self._rq_count
+            if pos >= size:
+                pos -= size
+            self._rq[pos] = idx
+            self._rq_count += 1
+        if not in_ISR:
+            pyb.enable_irq(irq_state)
+
+
+    ## Take the next task from the ready queue.
+    #  @return The task, or @c None if the queue is empty
+    @micropython.native
+    def _take(self):
+        if self._rq_count == 0:
+            return None
+        irq_state = pyb.disable_irq()
+        idx = self._rq[self._rq_head]
+        self._rq_head += 1
+        if self._rq_head >= len(self._rq):
+            self._rq_head = 0
+        self._rq_count -= 1
+        pyb.enable_irq(irq_state)
+        return self._tasks[idx]
+
+
+    ## Empty the ready queue. The priority and round-robin schedulers find
+    #  tasks started by go() from their go flags, so they just keep the
+    #  queue from filling up.
+    @micropython.native
+    def _flush(self):
+        if self._rq_count:
+            irq_state = pyb.disable_irq()
+            self._rq_count = 0
+            pyb.enable_irq(irq_state)
+
 
     ## Run tasks in order, ignoring the tasks' priorities.
     #
@@ -346,9 +840,16 @@ class TaskList:
     @micropython.native
     def rr_sched(self):
         # For each priority level, run all tasks at that level
+        self._flush()
+        ran = False
         for pri in self.pri_list:
             for task in pri[2:]:
-                task.schedule()
+                if task.schedule():
+                    ran = True
+
+        # If nothing was ready, the CPU is idle until the next release
+        if not ran:
+            self._idle()
 
 
     ## Run tasks according to their priorities.
@@ -359,6 +860,7 @@ class TaskList:
     @micropython.native
     def pri_sched(self):
         # Go down the list of priorities, beginning with the highest
+        self._flush()
         for pri in self.pri_list:
             # Within each priority list, run tasks in round-robin order
             # Each priority list is [priority, index, task, task, ...] where
@@ -374,22 +876,321 @@ class TaskList:
                 if ran:
                     return
 
+        # Nothing was ready to run, so the CPU is idle until the next release
+        self._idle()
+
+
+    ## Run the ready task whose deadline is nearest.
+    #
+    #  This scheduler implements earliest-deadline-first scheduling. A timed
+    #  task's deadline is its next release time, one period after the
+    #  release which made it ready. Each time it is called, this method
+    #  releases the tasks whose time has come and runs the one with the
+    #  earliest deadline. Task priorities are only used to break ties.
+    #  Tasks started by @c go() are taken from the ready queue and given a
+    #  deadline of the time at which they're found there, so they run
+    #  promptly; this is the only way tasks without a period are run.
+    #
+    #  Tasks are kept in two heaps, one of tasks waiting for their release
+    #  ordered by release time and one of ready tasks ordered by deadline,
+    #  so a pass takes O(log n) time rather than checking every task.
+    #  Heap keys are times relative to a base time, which is moved up now
+    #  and then so that the keys don't overflow as the tick counter wraps.
+    #  Deadline misses are counted for each task and shown in the task list.
+    @micropython.native
+    def edf_sched(self):
+        if self._edf_waiting is None:
+            self._edf_build()
+        clock = self.clock
+        waiting = self._edf_waiting
+        ready = self._edf_ready
+        now = clock.diff(clock.ticks(), self._edf_base)
+        if now > EDF_REBASE_US:
+            self._edf_rebase(now)
+            now = 0
+
+        # Move every task whose release time has come to the ready heap
+        while waiting and waiting[0][0] <= now:
+            entry = heapq.heappop(waiting)
+            task = entry[2]
+            rdy = task.ready()
+            entry[0] = clock.diff(task._next_run, self._edf_base)
+            heapq.heappush(ready if rdy else waiting, entry)
+
+        # Tasks started by go() are due now
+        task = self._take()
+        while task is not None:
+            entry = self._edf_go[task._idx]
+            if not entry[3]:
+                entry[0] = now
+                entry[3] = True
+                heapq.heappush(ready, entry)
+            task = self._take()
+
+        # Run the task with the earliest deadline
+        if ready:
+            entry = heapq.heappop(ready)
+            task = entry[2]
+            task.schedule()
+            if entry[3] is None:
+                entry[0] = clock.diff(task._next_run, self._edf_base)
+                heapq.heappush(waiting, entry)
+            else:
+                entry[3] = False
+
+        # Nothing was ready to run, so the CPU is idle until the next release
+        elif waiting:
+            self._idle(clock.add(self._edf_base, waiting[0][0]))
+        else:
+            self._idle()
+
+
+    ## Sort the tasks into the EDF scheduler's heaps. Each heap entry is a
+    #  list [key, sequence number, task, queued flag]; the sequence number
+    #  makes keys unique, so nothing after it is ever compared, and orders
+    #  entries with equal keys by priority. Timed tasks have an entry for
+    #  their timed releases, whose queued flag is @c None, and every task has
+    #  one for runs started by @c go(). A task's two entries can be in the
+    #  ready heap with the same key, so each entry has its own number. Entries
+    #  are reused, so no memory is allocated while scheduling.
+    def _edf_build(self):
+        self._edf_base = self.clock.ticks()
+        self._edf_waiting = []
+        self._edf_ready = []
+        self._edf_go = [None] * len(self._tasks)
+        seq = 0
+        for pri in self.pri_list:
+            for task in pri[2:]:
+                if task.period != None:
+                    entry = [0, seq, task, None]
+                    entry[0] = self.clock.diff(task._next_run, self._edf_base)
+                    heapq.heappush(self._edf_waiting, entry)
+                self._edf_go[task._idx] = [0, seq + 1, task, False]
+                seq += 2
+
+
+    ## Move the EDF base time up by @c shift microseconds. All keys in the
+    #  heaps move by the same amount, so the heaps stay in order. Entries for
+    #  @c go() which aren't queued are given a key when they're queued.
+    #  @param shift The number of microseconds by which to move the base
+    def _edf_rebase(self, shift):
+        self._edf_base = self.clock.add(self._edf_base, shift)
+        for entry in self._edf_waiting:
+            entry[0] -= shift
+        for entry in self._edf_ready:
+            entry[0] -= shift
+
+
+    ## Compile the timed tasks into a static cyclic executive table.
+    #
+    #  Time is divided into slots one tick long, the tick being the greatest
+    #  common divisor of the task periods. The table covers one hyperperiod,
+    #  the least common multiple of the periods, after which the pattern
+    #  repeats. Each task is given an offset, in ticks, which sets the slots
+    #  in which it runs. Offsets are chosen greedily, shortest period first,
+    #  to put each task in the slots with the least work already in them, so
+    #  that the tasks' runs are spread out rather than piled into the first
+    #  slot. The work in a slot is estimated from profiled run times when
+    #  the tasks have been profiled, otherwise as one unit per task.
+    #
+    #  The table is stored as two arrays: for slot @c n, the indices of the
+    #  tasks to run are <tt>tasks[starts[n]:starts[n + 1]]</tt>. Tasks
+    #  without a period are not in the table; they're run in spare time.
+    #  The table must be rebuilt after task periods are changed.
+    #  @return The schedule table, which is also saved in @c table
+    def build_table(self):
+        tasks = [task for pri in self.pri_list for task in pri[2:]
+                 if task.period != None]
+        tasks.sort(key=lambda task: task.period)
+        if not tasks:
+            raise ValueError("No timed tasks for a cyclic table")
+
+        # Find the tick and the hyperperiod
+        tick = 0
+        hyper = 1
+        for task in tasks:
+            tick = _gcd(tick, task.period)
+        for task in tasks:
+            per = task.period // tick
+            hyper = hyper * per // _gcd(hyper, per)
+        if hyper > MAX_TABLE_SLOTS:
+            raise ValueError(f"Cyclic table would need {hyper} slots")
+
+        # Place tasks one at a time where the busiest slot they'd share is
+        # least busy, then where the total load they'd share is least
+        load = [0] * hyper
+        slots = [[] for _ in range(hyper)]
+        for idx, task in enumerate(tasks):
+            per = task.period // tick
+            cost = self._run_cost(task)
+            best = None
+            for offset in range(per):
+                busy = max(load[offset::per])
+                total = sum(load[offset::per])
+                if best is None or (busy, total) < best[0]:
+                    best = ((busy, total), offset)
+            for slot in range(best[1], hyper, per):
+                load[slot] += cost
+                slots[slot].append(idx)
+
+        # Pack the slots into arrays. A hyperperiod of MAX_TABLE_SLOTS slots
+        # can hold more entries than 16 bit starts could count
+        starts = array.array('L', [0] * (hyper + 1))
+        indices = array.array('B')
+        for slot in range(hyper):
+            indices.extend(slots[slot])
+            starts[slot + 1] = len(indices)
+
+        self.table = (tick, starts, indices, tuple(tasks))
+        self._cyc_slot = 0
+        self._cyc_next = None
+        return self.table
+
+
+    ## Estimate a task's run time in microseconds from its profile data,
+    #  for use in placing tasks in the cyclic executive table. Tasks which
+    #  haven't been profiled are each counted as one microsecond.
+    #  @param task The task whose run time is to be estimated
+    @staticmethod
+    def _run_cost(task):
+        if task._prof and task.run_hist.count:
+            return max(1, task.run_hist.total // task.run_hist.count)
+        return 1
+
+
+    ## Run the timed tasks from a static, time-triggered table.
+    #
+    #  This scheduler implements a cyclic executive. Rather than ask every
+    #  task whether it's ready, it checks the time once to see whether the
+    #  next tick has come; if so, it runs all the tasks in that tick's slot of
+    #  the table made by @c build_table(). The overhead is therefore a
+    #  constant per slot and the start times of tasks are fixed, with jitter
+    #  bounded by the run times of the tasks sharing a slot. If the tasks
+    #  fall behind, slots are run one per call until the schedule catches up.
+    #  Between ticks, tasks started by @c go() are taken from the ready
+    #  queue and run in the order they were started.
+    @micropython.native
+    def cyc_sched(self):
+        if self.table is None:
+            self.build_table()
+        tick, starts, indices, tasks = self.table
+        clock = self.clock
+        now = clock.ticks()
+        if self._cyc_next is None:
+            self._cyc_next = clock.add(now, tick)
+
+        # If a tick has come, run the tasks in its slot
+        slot_time = self._cyc_next
+        late = clock.diff(now, slot_time)
+        if late >= 0:
+            slot = self._cyc_slot
+            for num in range(starts[slot], starts[slot + 1]):
+                task = tasks[indices[num]]
+                task._released = slot_time
+                task._next_run = clock.add(slot_time, task.period)
+                if task._prof:
+                    task.late_hist.add(late)
+                task.run()
+            slot += 1
+            self._cyc_slot = slot if slot < len(starts) - 1 else 0
+            self._cyc_next = clock.add(slot_time, tick)
+            return
+
+        # Between ticks, run a task started by go() which hasn't yet run
+        task = self._take()
+        while task is not None:
+            if task.go_flag:
+                task.run()
+                return
+            task = self._take()
+
+        # Nothing was ready to run, so the CPU is idle until the next tick
+        self._idle(slot_time)
+
+
+    ## Called by the schedulers when no task is ready to run.
+    #
+    #  The load meter's window is closed here if it's over, as well as after
+    #  task runs, so the load figures are up to date whether or not the CPU
+    #  has time to spare. Then, if
+    #  the clock is virtual or low-power idle is on, the clock is told when
+    #  the next task is due so that it can skip or sleep through the wait.
+    #  @param until The time of the next task release, if the scheduler
+    #         knows it; otherwise the timed tasks are checked to find it.
+    #         Tasks without a period can only be made ready by @c go(), so
+    #         they don't set a release time.
+    def _idle(self, until=None):
+        clock = self.clock
+        now = clock.ticks()
+        if clock.diff(now, self._win_start) >= self.load_window:
+            self._end_window(now)
+        if not clock.virtual and self.sleep_min_us is None:
+            return
+
+        if until is None:
+            for pri in self.pri_list:
+                for task in pri[2:]:
+                    if task.period != None and (until is None or
+                            clock.diff(task._next_run, until) < 0):
+                        until = task._next_run
+            if until is None:
+                return
+        wait = clock.diff(until, now)
+        if wait > 0 and (clock.virtual or wait >= self.sleep_min_us):
+            clock.idle(until)
+
+
+    ## Close a load measurement window, working out the fraction of the
+    #  window spent running each task and all the tasks together.
+    #  @param now The time at which the window ends
+    def _end_window(self, now):
+        elapsed = self.clock.diff(now, self._win_start)
+        busy = 0
+        for pri in self.pri_list:
+            for task in pri[2:]:
+                busy += task._busy
+                task.load = 100.0 * task._busy / elapsed
+                task._busy = 0
+        self.load = 100.0 * busy / elapsed
+        self._win_start = now
+
 
     ## Create some diagnostic text showing the tasks in the task list.
     def __repr__(self):
-        ret_str = 'TASK             PRI    PERIOD    RUNS   AVG DUR   MAX ' \
-            'DUR  AVG LATE  MAX LATE\n'
+        ret_str = 'TASK             PRI    PERIOD    RUNS DL MISS  MISSED  LOAD %' \
+            '   AVG DUR   MAX DUR  AVG LATE  MAX LATE  MAX RESP\n'
         for pri in self.pri_list:
             for task in pri[2:]:
                 ret_str += str(task) + '\n'
+        ret_str += f"CPU load {self.load:.1f} % over {self.load_window / 1e6:.2f} s\n"
 
         return ret_str
 
 
+## Return the greatest common divisor of two non-negative integers.
+def _gcd(a, b):
+    while b:
+        a, b = b, a % b
+    return a
+
+
+## The clock source used by tasks and task lists which aren't given one.
+default_clock = TicksClock()
+
+
 ## This is @b the main task list which is created for scheduling when 
 #  @c cotask.py is imported into a program. 
 task_list = TaskList()
 
 
+## Change the clock source used by tasks created from now on and by the main
+#  task list. This must be called before the tasks are created.
+#  @param clock The new clock source, such as a @c VirtualClock
+def set_clock(clock):
+    global default_clock
+    default_clock = clock
+    task_list.clock = clock
+
+
 
 
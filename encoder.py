@@ -6,16 +6,26 @@ Created on Thu Jan 30 13:55:40 2025
 @author: Tomas Franco
 
 Purpose: Provides a quadrature encoder decoding interface.
-         This class tracks the encoder's accumulated position, computes the velocity,
-         and handles counter overflows using a moving average of recent updates.
+         This class tracks the encoder's exact accumulated position, estimates the
+         velocity, and extends the 16-bit timer count to 32 bits by counting the
+         counter's overflows in the timer's update interrupt, or when reading the
+         count if that interrupt is still pending. The velocity comes from an
+         alpha-beta tracker, which follows the position with a constant-velocity
+         model, so it doesn't lag behind as a moving average does. A moving average
+         of recent updates is also kept, with running sums over ring buffers, so
+         updates take the same time for any window length.
 """
 
 # ---------
 # Imports
 # ---------
 from time import ticks_us, ticks_diff  # For computing time differences in microseconds
-from pyb import Timer, Pin
+from pyb import Timer, Pin, disable_irq, enable_irq
+from array import array
 import math
+import stm
+
+TIM_SR_UIF = 0x0001  # Update interrupt flag in a timer's status register
 
 # ------------------------------------
 # Encoder Class for Quadrature Decoding
@@ -23,66 +33,129 @@ import math
 class Encoder:
     '''A quadrature encoder decoding interface encapsulated in a Python class'''
 
-    def __init__(self, tim, chA_pin, chB_pin):
-         '''Initializes an Encoder object by setting up the timer and channels'''
+    def __init__(self, tim, chA_pin, chB_pin, window=6, alpha=0.5):
+         '''Initializes an Encoder object by setting up the timer and channels.
+         window is the number of updates in the moving average, and alpha the
+         alpha-beta tracker's position gain, from 0 to 1; lower values smooth
+         the velocity more. The velocity gain beta is chosen from alpha for a
+         critically damped response.'''
          # Configure timer with maximum period and no prescaler.
          self.timer = Timer(tim, period=0xFFFF, prescaler=0)
          # Setup channels for quadrature encoding.
          self.timer.channel(1, pin=Pin(chA_pin), mode=Timer.ENC_AB)
          self.timer.channel(2, pin=Pin(chB_pin), mode=Timer.ENC_AB)
+         # Count the times the counter wraps, from the update interrupt. Its
+         # status register shows a wrap the interrupt hasn't handled yet.
+         self.wraps = 0
+         self.sr_addr = getattr(stm, 'TIM{:d}'.format(tim)) + stm.TIM_SR
+         self.timer.callback(self._wrapped)
          
-         self.position = 0          # Total accumulated position of the encoder.
+         self.window = window       # Number of updates in the moving average.
+         self.position = 0          # Total accumulated position in counts.
          self.prev_count = 0        # Counter value from the most recent update.
          self.delta = 0             # Change in count between successive updates.
-         self.delta_buffer = [0, 0, 0, 0, 0, 0]  # Buffer for recent delta values (for averaging).
+         self.delta_buffer = array('l', [0] * window)  # Ring buffer of recent delta values.
+         self.delta_sum = 0         # Sum of delta_buffer.
          self.prev_time = 0         # Timestamp from the previous update (in µs).
          self.dt = 0                # Time difference between the last two updates.
-         self.dt_buffer = [0, 0, 0, 0, 0, 0]     # Buffer for recent dt values (for averaging).
+         self.dt_buffer = array('l', [0] * window)     # Ring buffer of recent dt values.
+         self.dt_sum = 0            # Sum of dt_buffer.
+         self.head = 0              # Index of the oldest entries in the ring buffers.
+         self.alpha = alpha         # Alpha-beta tracker gains; this beta
+         # puts both poles of the tracking error at sqrt(1 - alpha), so it
+         # settles without overshoot.
+         self.beta = 2 - alpha - 2 * math.sqrt(1 - alpha)
+         self.ab_error = 0.0        # Tracked position minus measured position, in counts.
+         self.ab_velocity = 0.0     # Tracked velocity in counts per second.
+         self.started = False       # Whether update() has been called yet.
          self.conv_factor_rad = 2 * math.pi / 1440  # Conversion factor from counts to radians.
          
     def update(self):
-        '''Performs one update cycle: computes time difference, handles counter overflow,
-        averages delta values, and updates the total position.'''
+        '''Performs one update cycle: computes time difference, reads the extended count,
+        updates the total position and the velocity estimates. The count is correct
+        however long it has been since the last update.'''
         current_time = ticks_us()  # Get current time in microseconds.
         self.dt = ticks_diff(current_time, self.prev_time)
-        # Update the dt buffer for averaging.
-        self.dt_buffer.pop(0)
-        self.dt_buffer.append(self.dt)
+        # Replace the oldest dt in the buffer, keeping the sum up to date.
+        head = self.head
+        self.dt_sum += self.dt - self.dt_buffer[head]
+        self.dt_buffer[head] = self.dt
         
-        current_count = self.timer.counter()  # Get current counter value.
+        current_count = self.get_count()  # Get current extended count.
         diff_count = current_count - self.prev_count
-        # Handle counter underflow/overflow for a 16-bit counter.
-        if diff_count < -32768:
-            diff_count += 65536
-        elif diff_count > 32768:
-            diff_count -= 65536
         self.delta = diff_count
-        # Update the delta buffer for averaging.
-        self.delta_buffer.pop(0)
-        self.delta_buffer.append(self.delta)
+        # Replace the oldest delta in the buffer, keeping the sum up to date.
+        self.delta_sum += diff_count - self.delta_buffer[head]
+        self.delta_buffer[head] = diff_count
+        head += 1
+        self.head = head if head < self.window else 0
         
         # Update previous time and counter for the next update.
         self.prev_time = current_time
         self.prev_count = current_count
         
-        # Compute the average delta from the buffered values.
-        pos_avg = sum(self.delta_buffer) / 6
-        # Accumulate the averaged delta into the total position.
-        self.position += pos_avg
+        # Accumulate the exact count into the total position.
+        self.position += diff_count
+        
+        # Alpha-beta tracker: predict where the tracked position has moved to
+        # at the tracked velocity, then correct both by the prediction error.
+        # The error is kept relative to the measured position, so it stays
+        # small however far the wheel has turned.
+        if self.started and self.dt > 0:
+            dt_s = self.dt / 1000000
+            error = self.ab_error + self.ab_velocity * dt_s - diff_count
+            self.ab_error = error * (1 - self.alpha)
+            self.ab_velocity -= self.beta * error / dt_s
+        self.started = True
         
+    def _wrapped(self, timer):
+         '''Timer update interrupt, run each time the 16-bit counter wraps. A counter
+         near zero has wrapped upwards, one near 0xFFFF downwards. Runs in interrupt
+         context, so only changes a small integer.'''
+         if timer.counter() < 0x8000:
+             self.wraps += 1
+         else:
+             self.wraps -= 1
+
+    def get_count(self):
+         '''Returns the 32-bit extended count: the wraps counted by the interrupt and
+         the 16-bit counter, read together with interrupts disabled. If the counter
+         has wrapped but the interrupt hasn't run yet, as when it's called with
+         interrupts already disabled, the update flag is still set; that wrap is then
+         counted here and the flag cleared, so the interrupt doesn't count it again.'''
+         irq_state = disable_irq()
+         count = self.timer.counter()
+         if stm.mem32[self.sr_addr] & TIM_SR_UIF:
+             # Read again, in case the counter wrapped just after the first read
+             count = self.timer.counter()
+             stm.mem32[self.sr_addr] = 0xFFFF & ~TIM_SR_UIF
+             if count < 0x8000:
+                 self.wraps += 1
+             else:
+                 self.wraps -= 1
+         wraps = self.wraps
+         enable_irq(irq_state)
+         return (wraps << 16) + count
+
     def get_position(self):
-         '''Returns the encoder's position converted to radians based on the conversion factor.'''
+         '''Returns the encoder's position converted to radians based on the conversion factor.
+         The position is exact to the count, as of the latest update.'''
          position_rad = self.position * self.conv_factor_rad
          return position_rad
 
     def get_velocity(self):
+         '''Returns the encoder's angular velocity (radians per second) from the
+         alpha-beta tracker.'''
+         return self.ab_velocity * self.conv_factor_rad
+
+    def get_avg_velocity(self):
          '''Calculates and returns the encoder's angular velocity (radians per second)
          using the averaged delta and time difference from recent updates.'''
          if self.dt == 0:
              return 0
          
-         dt_avg = sum(self.dt_buffer) / 6
-         pos_avg = sum(self.delta_buffer) / 6
+         dt_avg = self.dt_sum / self.window
+         pos_avg = self.delta_sum / self.window
          delta_rad = pos_avg * self.conv_factor_rad
          dt_s = dt_avg / 1000000  # Convert microseconds to seconds.
          return delta_rad / dt_s
@@ -98,4 +171,4 @@ class Encoder:
     def zero(self):
          '''Resets the total position to zero and updates the reference counter value.'''
          self.position = 0
-         self.prev_count = self.timer.counter()
+         self.prev_count = self.get_count()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 2026
+
+@authors: Charith Sunku and Tomas Franco
+
+Purpose: Provides a manager for an I2C bus, which owns the pyb.I2C peripheral
+         so that all traffic on the bus goes through one place. This module
+         enables:
+         - Periodic read subscriptions to a block of a device's registers at a
+           given rate, with a callback given the data after each read,
+         - Merging subscriptions to overlapping or nearby register blocks of
+           one device into a single burst read,
+         - Running the due reads from a scheduler task, one transfer phase per
+           run, so no run is held up for more than half a transaction, and
+         - Reporting the bus time used, both measured and as predicted from
+           the subscriptions.
+         Drivers can be given the manager in place of a pyb.I2C object: its
+         mem_read(), mem_write(), send() and recv() pass straight through to
+         the bus and are counted in the statistics.
+"""
+
+# ---------
+# Imports
+# ---------
+import pyb
+import time
+
+# Reading up to this many unwanted bytes between two register blocks costs
+# less bus time than the address, register and restart of a second read.
+MERGE_GAP = 4
+
+# -------------------------------------
+# Subscription: One Periodic Register Read
+# -------------------------------------
+class Subscription:
+    def __init__(self, address, reg, nbytes, period_ms, callback):
+        """
+        A periodic read of 'nbytes' from register 'reg' of the device at
+        'address', made every 'period_ms' milliseconds. 'callback' is called
+        with a memoryview of the data after each read; it's only valid
+        during the call, so copy anything which is kept.
+        """
+        self.address = address
+        self.reg = reg
+        self.nbytes = nbytes
+        self.period_us = period_ms * 1000
+        self.callback = callback
+        self.next_us = time.ticks_us()   # Time the next read is due
+        self.data = None                 # View of the burst buffer, once merged
+
+# ---------------------------------
+# Burst: Merged Reads of One Device
+# ---------------------------------
+class _Burst:
+    def __init__(self, address, reg, nbytes, subs):
+        """
+        One read of 'nbytes' from register 'reg' of the device at 'address',
+        covering the register blocks of the subscriptions 'subs'.
+        """
+        self.address = address
+        self.reg = reg
+        self.buf = bytearray(nbytes)
+        self.subs = subs
+        view = memoryview(self.buf)
+        for sub in subs:
+            sub.data = view[sub.reg - reg:sub.reg - reg + sub.nbytes]
+
+# ---------------------------------
+# I2C Bus Manager Class
+# ---------------------------------
+class I2CBus:
+    def __init__(self, bus, baudrate=400000):
+        """
+        Initialize I2C bus number 'bus' in CONTROLLER mode at 'baudrate'.
+        """
+        self.i2c = pyb.I2C(bus)
+        self.i2c.init(pyb.I2C.CONTROLLER, baudrate=baudrate)
+        self.baudrate = baudrate
+        self.subs = []
+        self.bursts = []
+        self.pending = None      # Burst whose register address has been sent
+        self.reset_stats()
+
+    def subscribe(self, address, reg, nbytes, period_ms, callback):
+        """
+        Read 'nbytes' from register 'reg' of the device at 'address' every
+        'period_ms' milliseconds, and pass the data to 'callback'; see
+        Subscription. The device's subscriptions are merged into as few
+        bursts as possible, each read whenever one of its subscriptions is
+        due. Returns the Subscription.
+        """
+        sub = Subscription(address, reg, nbytes, period_ms, callback)
+        self.subs.append(sub)
+        self._merge(address)
+        return sub
+
+    def unsubscribe(self, sub):
+        """
+        Stop the periodic read 'sub' and merge the device's other
+        subscriptions again without it.
+        """
+        self.subs.remove(sub)
+        self._merge(sub.address)
+
+    def _merge(self, address):
+        """
+        Rebuild the bursts for the device at 'address' from its subscriptions,
+        joining register blocks which overlap or lie within MERGE_GAP bytes of
+        each other. Allocates the burst buffers, so it's only called when the
+        subscriptions change.
+        """
+        subs = sorted([sub for sub in self.subs if sub.address == address],
+                      key=lambda sub: sub.reg)
+        bursts = [burst for burst in self.bursts if burst.address != address]
+        group = []
+        end = 0
+        for sub in subs:
+            if group and sub.reg > end + MERGE_GAP:
+                bursts.append(_Burst(address, group[0].reg, end - group[0].reg, group))
+                group = []
+            if not group:
+                end = sub.reg
+            group.append(sub)
+            end = max(end, sub.reg + sub.nbytes)
+        if group:
+            bursts.append(_Burst(address, group[0].reg, end - group[0].reg, group))
+        self.bursts = bursts
+        self.pending = None
+
+    def _next_due(self, now):
+        """
+        Return the burst whose most overdue subscription has waited longest,
+        or None if no subscription is due.
+        """
+        due = None
+        late_max = -1
+        for burst in self.bursts:
+            for sub in burst.subs:
+                late = time.ticks_diff(now, sub.next_us)
+                if late > late_max:
+                    late_max = late
+                    due = burst
+        return due
+
+    def service(self):
+        """
+        Make the next step of the scheduled reads. If a burst's register
+        address has been sent, its data is read and passed to the
+        subscriptions which are due; otherwise the address of the most
+        overdue burst is sent. Returns True if there's more to do, in which
+        case the calling task should run again soon.
+        """
+        burst = self.pending
+        if burst is not None:
+            self.pending = None
+            start = time.ticks_us()
+            self.i2c.recv(burst.buf, burst.address)
+            self._count(start)
+            now = time.ticks_us()
+            for sub in burst.subs:
+                if time.ticks_diff(now, sub.next_us) >= 0:
+                    sub.callback(sub.data)
+                    # Releases missed by more than a period are skipped,
+                    # keeping to the same phase so the reads don't drift
+                    # behind the releases of the task calling service()
+                    sub.next_us = time.ticks_add(sub.next_us, sub.period_us)
+                    while time.ticks_diff(now, sub.next_us) >= 0:
+                        sub.next_us = time.ticks_add(sub.next_us, sub.period_us)
+            return self._next_due(now) is not None
+        burst = self._next_due(time.ticks_us())
+        if burst is None:
+            return False
+        start = time.ticks_us()
+        self.i2c.send(burst.reg, burst.address)
+        self._count(start)
+        self.pending = burst
+        return True
+
+    def mem_read(self, data, addr, memaddr, **kwargs):
+        """
+        Read from a register like pyb.I2C.mem_read(). A scheduled read
+        waiting for its data is started again, since this moves the device's
+        register pointer.
+        """
+        self.pending = None
+        start = time.ticks_us()
+        data = self.i2c.mem_read(data, addr, memaddr, **kwargs)
+        self._count(start)
+        return data
+
+    def mem_write(self, data, addr, memaddr, **kwargs):
+        """
+        Write to a register like pyb.I2C.mem_write().
+        """
+        self.pending = None
+        start = time.ticks_us()
+        self.i2c.mem_write(data, addr, memaddr, **kwargs)
+        self._count(start)
+
+    def send(self, data, addr=0x00, **kwargs):
+        """
+        Send data like pyb.I2C.send().
+        """
+        self.pending = None
+        start = time.ticks_us()
+        self.i2c.send(data, addr, **kwargs)
+        self._count(start)
+
+    def recv(self, data, addr=0x00, **kwargs):
+        """
+        Receive data like pyb.I2C.recv().
+        """
+        self.pending = None
+        start = time.ticks_us()
+        data = self.i2c.recv(data, addr, **kwargs)
+        self._count(start)
+        return data
+
+    def _count(self, start):
+        """
+        Add a transfer which began at time.ticks_us() 'start' to the
+        statistics.
+        """
+        us = time.ticks_diff(time.ticks_us(), start)
+        self.xfer_count += 1
+        self.busy_us += us
+        if us > self.max_us:
+            self.max_us = us
+
+    def get_stats(self):
+        """
+        Return (number of transfers, mean us, longest us, percent of the time
+        the bus was busy) since the statistics were last reset.
+        """
+        elapsed = time.ticks_diff(time.ticks_us(), self.stats_start)
+        if self.xfer_count == 0 or elapsed <= 0:
+            return (0, 0, 0, 0.0)
+        return (self.xfer_count, self.busy_us // self.xfer_count, self.max_us,
+                100 * self.busy_us / elapsed)
+
+    def reset_stats(self):
+        """
+        Clear the statistics and start measuring again from now.
+        """
+        self.xfer_count = 0
+        self.busy_us = 0
+        self.max_us = 0
+        self.stats_start = time.ticks_us()
+
+    def get_scheduled_load(self):
+        """
+        Return the percent of bus time the subscriptions need, from the bits
+        on the wire: each burst is the device address and register, then the
+        address again and the data, 9 bits a byte, at its fastest
+        subscription's rate. Software overhead isn't included.
+        """
+        load = 0.0
+        for burst in self.bursts:
+            period_us = min([sub.period_us for sub in burst.subs])
+            bits = 9 * (len(burst.buf) + 3)
+            load += bits * 1000000 / self.baudrate / period_us
+        return 100 * load
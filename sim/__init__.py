@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 2026
+
+@authors: Charith Sunku and Tomas Franco
+
+Purpose: Host-side simulator for the Romi line follower.
+         The shim directory holds CPython stand-ins for pyb, stm, utime and
+         micropython, so the drivers, cotask and task_share run unmodified on
+         a PC. The stand-ins read and drive a differential-drive model of the
+         Romi (romi.py) on a virtual clock, with the IR array looking at a
+         track bitmap (track.py). run_main.py runs the task set in main.
+"""
+
+# ---------
+# Imports
+# ---------
+import os
+import sys
+import time
+
+SHIM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shim')
+
+
+def install():
+    """
+    Make the shims importable as pyb, stm, utime and micropython, and add the
+    MicroPython ticks and sleep functions to the host's time module, which
+    the drivers also import.
+    """
+    if SHIM_DIR not in sys.path:
+        sys.path.insert(0, SHIM_DIR)
+    import utime
+    for name in ('ticks_us', 'ticks_ms', 'ticks_cpu', 'ticks_diff',
+                 'ticks_add', 'sleep_us', 'sleep_ms'):
+        setattr(time, name, getattr(utime, name))
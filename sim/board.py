@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 2026
+
+@authors: Charith Sunku and Tomas Franco
+
+Purpose: Shared state between the host-side pyb/utime stand-ins and the Romi
+         plant model. This module holds:
+             - The virtual microsecond clock every shim reads its time from.
+             - Registries of the pins, encoder timers, external interrupts
+               and I2C devices created by the drivers.
+             - A reference to the attached plant, which the shims call to
+               turn motor outputs into sensor readings.
+"""
+
+# ---------------------------------
+# Virtual Clock
+# ---------------------------------
+class Clock:
+    """
+    Virtual microsecond clock.
+
+    Time only moves when something spends it: a delay or sleep, a modelled
+    peripheral transfer, or a small fixed cost charged on every clock read so
+    that busy-wait loops still make progress.
+    """
+    def __init__(self, read_cost_us=2):
+        self.now_us = 0
+        self.read_cost_us = read_cost_us   # Rough CPU cost of one ticks read
+
+    def read(self):
+        """
+        Return the current time, charging the cost of the read.
+        """
+        self.now_us += self.read_cost_us
+        return self.now_us
+
+    def advance(self, us):
+        """
+        Spend 'us' microseconds of virtual time.
+        """
+        if us > 0:
+            self.now_us += int(us)
+
+    def advance_to(self, t_us):
+        """
+        Jump forward to absolute time 't_us' if it lies in the future.
+        """
+        if t_us > self.now_us:
+            self.now_us = int(t_us)
+
+
+clock = Clock()
+
+# Registries filled in by the shims as the drivers create peripherals.
+pins = {}        # Pin name -> shim Pin object
+timers = {}      # Timer number -> shim Timer object
+encoders = {}    # Channel A pin name -> shim Timer in ENC_AB mode
+extints = {}     # Pin name -> (ExtInt object, callback)
+timed = {}       # Timer number -> shim Timer counting at a set freq with a callback
+timer_due = None # Earliest _next_us of the timers in timed, or None
+i2c_devices = {} # 7-bit address -> device model with read()/write()
+
+# The plant model driving the sensors, or None when only the shims are used.
+plant = None
+
+
+def attach(new_plant):
+    """
+    Attach a plant model so that peripheral reads come from its state.
+    """
+    global plant
+    plant = new_plant
+
+
+def sync():
+    """
+    Bring the plant state up to the current virtual time.
+    """
+    if plant is not None:
+        plant.sync()
+
+
+def fire_extint(pin_name):
+    """
+    Invoke the external interrupt callback attached to 'pin_name', if any.
+    Returns True when a callback was run.
+    """
+    entry = extints.get(pin_name)
+    if entry is None or not entry[0].enabled:
+        return False
+    entry[1](entry[0].line())
+    return True
+
+
+def schedule_timer(tim):
+    """
+    Run the update callback of shim Timer 'tim' on virtual time, every
+    'tim._update_us' from 'tim._next_us'.
+    """
+    timed[tim._id] = tim
+    _update_due()
+
+
+def unschedule_timer(id):
+    """
+    Stop running the update callback of timer number 'id' on virtual time.
+    """
+    if timed.pop(id, None) is not None:
+        _update_due()
+
+
+def _update_due():
+    global timer_due
+    timer_due = min(tim._next_us for tim in timed.values()) if timed else None
+
+
+def next_timer_us():
+    """
+    Return the virtual time of the next timer update callback, or None if no
+    timer is running one.
+    """
+    return timer_due
+
+
+def fire_timers():
+    """
+    Invoke the update callback of each timer whose period has run out, once
+    for each period. Returns True when a callback was run.
+    """
+    now = clock.now_us
+    if timer_due is None or timer_due > now:
+        return False
+    for tim in list(timed.values()):
+        while tim._id in timed and tim._next_us <= now:
+            tim._next_us += tim._update_us
+            tim._callback(tim)
+    _update_due()
+    return True
+
+
+def reset():
+    """
+    Forget all registered peripherals and restart the clock at zero.
+    """
+    global plant
+    clock.now_us = 0
+    pins.clear()
+    timers.clear()
+    encoders.clear()
+    extints.clear()
+    timed.clear()
+    _update_due()
+    i2c_devices.clear()
+    plant = None
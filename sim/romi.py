@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 2026
+
+@authors: Charith Sunku and Tomas Franco
+
+Purpose: Differential-drive plant model of the Romi for the host simulator.
+         This module includes:
+             - Wheel class: First-order motor response driven by the PWM, DIR
+               and nSLP pins, integrated into a wheel angle and encoder count.
+             - BNO055Model class: Register-level model of the IMU which serves
+               Euler heading and gyro data from the robot's pose.
+             - Romi class: Integrates the robot pose on the virtual clock and
+               turns it into IR ADC readings from a track bitmap, encoder
+               counts, IMU registers and bump sensor interrupts.
+         The wiring defaults match the pin assignments in main.
+"""
+
+# ---------
+# Imports
+# ---------
+import math
+import random
+
+from sim import board
+from IR_sensor import IR_PITCH_MM
+
+# Pin assignments used in main.
+IR_PINS = ("C2", "C3", "A0", "A1", "A4", "B0", "C1", "C0", "A6", "A7", "C5",
+           "B1", "C4")
+IR_EVEN_PIN = "B14"
+IR_ODD_PIN = "B13"
+BUMP_PINS = ("B12", "B11", "B6", "C7", "B10", "B15")
+WHEEL_PINS = {"right": {"pwm": "A8", "dir": "H1", "slp": "H0", "enc": "B4"},
+              "left":  {"pwm": "A9", "dir": "B2", "slp": "A2", "enc": "A15"}}
+
+
+# ----------------------------------
+# Wheel Class: Motor and Encoder Model
+# ----------------------------------
+class Wheel:
+    def __init__(self, pins, gain, deadband=5.0, tau_s=0.075):
+        """
+        Model one drive wheel.
+        Args:
+            pins (dict): Names of the 'pwm', 'dir', 'slp' and 'enc' pins.
+            gain (float): Steady-state wheel speed per % duty above the
+                deadband, in rad/s.
+            deadband (float): Duty in % needed before the wheel turns.
+            tau_s (float): Motor time constant in seconds.
+        """
+        self.pins = pins
+        self.gain = gain
+        self.deadband = deadband
+        self.tau_s = tau_s
+        self.omega = 0.0     # Wheel speed in rad/s
+        self.angle = 0.0     # Wheel angle in rad
+        self._decay = {}     # Step length -> fraction of the speed error removed
+        self._pins = None    # Driver pin objects, found once main makes them
+
+    def target(self):
+        """
+        Return the steady-state speed commanded by the driver pins.
+        """
+        if self._pins is None:
+            self._pins = [board.pins.get(self.pins[key])
+                          for key in ("slp", "pwm", "dir")]
+            if None in self._pins:
+                self._pins = None
+                return 0.0
+        slp, pwm, direction = self._pins
+        if not slp._value:
+            return 0.0
+        duty = pwm.duty - self.deadband
+        if duty <= 0:
+            return 0.0
+        return -self.gain * duty if direction._value else self.gain * duty
+
+    def step(self, dt):
+        """
+        Advance the motor response and wheel angle by 'dt' seconds.
+        """
+        decay = self._decay.get(dt)
+        if decay is None:
+            decay = self._decay[dt] = 1 - math.exp(-dt / self.tau_s)
+        self.omega += (self.target() - self.omega) * decay
+        self.angle += self.omega * dt
+
+    def count(self):
+        """
+        Return the quadrature count, 1440 counts per wheel revolution.
+        """
+        return int(math.floor(self.angle * Romi.COUNTS_PER_REV / (2 * math.pi)))
+
+
+# ---------------------------------
+# BNO055 Register Model
+# ---------------------------------
+class BNO055Model:
+    CHIP_ID = 0xA0
+    OPR_MODE = 0x3D
+    CALIB_STAT = 0x35
+    GYR_DATA_ADDR = 0x14
+    EULER_DATA_ADDR = 0x1A
+    CALIB_DATA_ADDR = 0x55
+    CALIB_DATA_LEN = 22
+
+    def __init__(self, romi, heading0_deg=90.0):
+        """
+        Model the IMU mounted on 'romi'. The heading register reads
+        'heading0_deg' at the start pose and increases clockwise.
+        """
+        self.romi = romi
+        self.heading0_deg = heading0_deg
+        self.registers = bytearray(0x80)
+        self.registers[0x00] = BNO055Model.CHIP_ID
+        self.calibrated = False
+
+    def _put16(self, reg, value):
+        value = int(round(value)) & 0xFFFF
+        self.registers[reg] = value & 0xFF
+        self.registers[reg + 1] = value >> 8
+
+    def _refresh(self):
+        # Data registers only update while a fusion mode is running
+        if self.registers[BNO055Model.OPR_MODE] == 0:
+            return
+        romi = self.romi
+        heading = (self.heading0_deg
+                   - math.degrees(romi.theta - romi.theta0)) % 360.0
+        self._put16(BNO055Model.EULER_DATA_ADDR, heading * 16)
+        self._put16(BNO055Model.EULER_DATA_ADDR + 2, 0)
+        self._put16(BNO055Model.EULER_DATA_ADDR + 4, 0)
+        self._put16(BNO055Model.GYR_DATA_ADDR, 0)
+        self._put16(BNO055Model.GYR_DATA_ADDR + 2, 0)
+        self._put16(BNO055Model.GYR_DATA_ADDR + 4, math.degrees(romi.omega) * 16)
+        mag = 3 if self.calibrated or board.clock.now_us > 5000000 else 0
+        self.registers[BNO055Model.CALIB_STAT] = (mag << 6) | 0x30 | (mag << 2) | mag
+
+    def read(self, reg, nbytes):
+        """
+        Return 'nbytes' register values starting at 'reg'.
+        """
+        self._refresh()
+        return self.registers[reg:reg + nbytes]
+
+    def write(self, reg, data):
+        """
+        Write register values starting at 'reg'. Calibration data is only
+        accepted in CONFIGMODE, as on the real sensor.
+        """
+        cal = BNO055Model.CALIB_DATA_ADDR
+        in_config = self.registers[BNO055Model.OPR_MODE] == 0
+        for offset, value in enumerate(data):
+            addr = reg + offset
+            if cal <= addr < cal + BNO055Model.CALIB_DATA_LEN:
+                if not in_config:
+                    continue
+                self.calibrated = True
+            self.registers[addr] = value
+
+
+# ----------------------------------
+# Romi Class: Plant Model
+# ----------------------------------
+class Romi:
+    WHEEL_RADIUS_MM = 35.0
+    TRACK_WIDTH_MM = 141.0
+    COUNTS_PER_REV = 1440
+    BODY_RADIUS_MM = 82.0
+    IR_OFFSET_MM = 70.0      # Array centre ahead of the wheel axis
+    IR_EMIT_SIGNAL = 3200.0  # ADC counts of reflected emitter light on white
+    IR_EMIT_TAU_US = 15.0    # Emitter/phototransistor settling time constant
+    IR_NOISE = 12.0          # ADC noise standard deviation in counts
+    STEP_US = 2000           # Integration step
+
+    def __init__(self, track, ambient=0.0, seed=1, imu_address=0x28):
+        """
+        Create the plant on 'track' at the track's start pose and attach it to
+        the simulator board.
+        Args:
+            track (Track): Surface and walls the robot drives on.
+            ambient (float): Ambient light reaching the IR sensors, in ADC
+                counts on a white surface.
+            seed (int): Seed for the sensor noise generator.
+            imu_address (int): I2C address of the BNO055 model.
+        """
+        self.track = track
+        self.ambient = ambient
+        rng = random.Random(seed)
+        self._noise = [rng.gauss(0, Romi.IR_NOISE) for idx in range(4099)]
+        self._noise_idx = 0
+        self.x, self.y, theta_deg = track.start
+        self.theta = self.theta0 = math.radians(theta_deg)
+        self.omega = 0.0
+        self.speed = 0.0
+        self.right = Wheel(WHEEL_PINS["right"], gain=0.215)
+        self.left = Wheel(WHEEL_PINS["left"], gain=0.208)
+        self.t_us = board.clock.now_us
+        self.steps = 0
+        self.surface = None       # 'dark' or 'light' holds a calibration card
+        self.distance_mm = 0.0
+        self.frames = 0
+        self.frames_on_line = 0
+        self.collisions = 0
+        self._ir_index = {name: idx for idx, name in enumerate(IR_PINS)}
+        self._ir_step = -1
+        self._ir_reflect = [0.92] * len(IR_PINS)   # Fraction of light reflected
+        self._banks = [None, None]   # Odd and even emitter pins
+        self._ir_lats = [tuple(IR_PITCH_MM * (idx - 6) + d
+                               for d in (-IR_PITCH_MM / 4, 0, IR_PITCH_MM / 4))
+                         for idx in range(len(IR_PINS))]
+        self._bumps_down = set()
+        self.imu = BNO055Model(self)
+        board.i2c_devices[imu_address] = self.imu
+        board.attach(self)
+
+    # -----------------------------
+    # Time integration
+    # -----------------------------
+    def sync(self):
+        """
+        Integrate the plant in whole steps up to the current virtual time.
+        The pose therefore lags the clock by less than one step.
+        """
+        now = board.clock.now_us
+        dt = Romi.STEP_US / 1000000
+        while now - self.t_us >= Romi.STEP_US:
+            self._step(dt)
+            self.t_us += Romi.STEP_US
+
+    def _step(self, dt):
+        right, left = self.right, self.left
+        right.step(dt)
+        left.step(dt)
+        r = Romi.WHEEL_RADIUS_MM
+        self.speed = r * (right.omega + left.omega) / 2
+        self.omega = r * (right.omega - left.omega) / Romi.TRACK_WIDTH_MM
+        x, y, theta = self.x, self.y, self.theta
+        self.x += self.speed * math.cos(theta) * dt
+        self.y += self.speed * math.sin(theta) * dt
+        self.theta += self.omega * dt
+        if self.track.walls and self._check_bumps():
+            # Pushing against a wall: the chassis stays where it was
+            self.x, self.y, self.theta = x, y, theta
+        self.distance_mm += abs(self.speed) * dt
+        self.steps += 1
+        for wheel in (right, left):
+            timer = board.encoders.get(wheel.pins["enc"])
+            if timer is not None and timer._callback is not None:
+                timer._check_wrap(wheel.count())
+
+    def _check_bumps(self):
+        # Six switches spread across the front of the chassis, right to left
+        touching = set()
+        n = len(BUMP_PINS)
+        for idx, name in enumerate(BUMP_PINS):
+            ang = self.theta + math.radians(-60 + 120 * idx / (n - 1))
+            px = self.x + Romi.BODY_RADIUS_MM * math.cos(ang)
+            py = self.y + Romi.BODY_RADIUS_MM * math.sin(ang)
+            if self.track.in_wall(px, py):
+                touching.add(name)
+        for name in touching - self._bumps_down:
+            self.collisions += 1
+            board.fire_extint(name)
+        self._bumps_down = touching
+        return bool(touching)
+
+    # -----------------------------
+    # Sensor readings
+    # -----------------------------
+    def encoder_count(self, enc_pin):
+        """
+        Return the raw count of the encoder whose channel A is on 'enc_pin'.
+        """
+        for wheel in (self.right, self.left):
+            if wheel.pins["enc"] == enc_pin:
+                return wheel.count()
+        return 0
+
+    def _update_ir(self):
+        # Sample the bitmap under each sensor and a quarter of the pitch to
+        # either side of it, at most once per integration step
+        self._ir_step = self.steps
+        if self.surface is not None:
+            value = 1.0 if self.surface == 'dark' else 0.0
+            self._ir_reflect[:] = [0.92 - 0.84 * value] * len(IR_PINS)
+            return
+        cos_t, sin_t = math.cos(self.theta), math.sin(self.theta)
+        track = self.track
+        data, width, height = track.data, track.width, track.height
+        scale = 1 / (255 * 3)
+        # Array centre and the direction along the array, in pixels
+        res = track.mm_per_px
+        cx = (self.x + Romi.IR_OFFSET_MM * cos_t) / res
+        cy = (self.y + Romi.IR_OFFSET_MM * sin_t) / res
+        dx, dy = sin_t / res, cos_t / res
+        on_line = False
+        reflect = self._ir_reflect
+        for idx, lats in enumerate(self._ir_lats):
+            # Sensor 1 is on the left, sensor 13 on the right
+            total = 0
+            for lat in lats:
+                col = int(cx + lat * dx)
+                row = height - 1 - int(cy - lat * dy)
+                if 0 <= col < width and 0 <= row < height:
+                    total += data[row * width + col]
+            value = total * scale
+            reflect[idx] = 0.92 - 0.84 * value
+            if value > 0.5:
+                on_line = True
+        self.frames += 1
+        if on_line:
+            self.frames_on_line += 1
+
+    def adc_read(self, pin_name):
+        """
+        Return the 12-bit ADC reading on 'pin_name'. IR channels read high over
+        the black line and low over the white surface, as the QTR array does.
+        """
+        idx = self._ir_index.get(pin_name)
+        if idx is None:
+            return 0
+        now = board.clock.now_us
+        if now - self.t_us >= Romi.STEP_US:
+            self.sync()
+        if self._ir_step != self.steps:
+            self._update_ir()
+        return self._ir_value(idx, now)
+
+    def adc_read_multi(self, pin_names, bufs, index, convert_us):
+        """
+        Convert each channel in 'pin_names' in turn into place 'index' of its
+        buffer in 'bufs', spending 'convert_us' of virtual time on each, as
+        one tick of ADC.read_timed_multi() does. The plant is brought up to
+        date once for the whole group, since it spans much less than a step.
+        """
+        clock = board.clock
+        if clock.now_us - self.t_us >= Romi.STEP_US:
+            self.sync()
+        if self._ir_step != self.steps:
+            self._update_ir()
+        ir_index = self._ir_index
+        for name, buf in zip(pin_names, bufs):
+            clock.now_us += convert_us
+            idx = ir_index.get(name)
+            buf[index] = 0 if idx is None else self._ir_value(idx, clock.now_us)
+
+    def _ir_value(self, idx, now):
+        # Reading of IR channel 'idx' at time 'now', from the latest frame
+        bank = self._banks[idx & 1]
+        if bank is None:
+            bank = board.pins.get(IR_ODD_PIN if idx & 1 == 0 else IR_EVEN_PIN)
+            self._banks[idx & 1] = bank
+        if bank is None or not bank._value:
+            light = self.ambient
+        else:
+            on_us = now - bank.t_change_us
+            light = self.ambient + (Romi.IR_EMIT_SIGNAL if on_us > 200 else
+                                    Romi.IR_EMIT_SIGNAL
+                                    * (1 - math.exp(-on_us / Romi.IR_EMIT_TAU_US)))
+        # Noise comes from a table of Gaussian samples, which is much cheaper
+        # than drawing a new one for every conversion
+        noise_idx = self._noise_idx + 1
+        if noise_idx >= len(self._noise):
+            noise_idx = 0
+        self._noise_idx = noise_idx
+        value = int(4095 - self._ir_reflect[idx] * light + self._noise[noise_idx])
+        return 0 if value < 0 else 4095 if value > 4095 else value
+
+    def pose(self):
+        """
+        Return the pose as (x_mm, y_mm, theta_deg).
+        """
+        return self.x, self.y, math.degrees(self.theta)
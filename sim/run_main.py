@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 2026
+
+@authors: Charith Sunku and Tomas Franco
+
+Purpose: Runs the unmodified task set in main against the Romi plant model.
+         The script places the robot on a track, plays the USER button presses
+         and calibration cards a person would, and stops main after a given
+         amount of virtual time by raising KeyboardInterrupt, the same way
+         stopping the board from the REPL does. The scheduler runs on a
+         virtual cotask clock, so idle time between task releases is skipped
+         and runs take a small fraction of real time. main runs in a flash
+         directory standing in for the board's filesystem, a new temporary
+         one unless --flash names one to keep files such as the IMU
+         calibration profile between runs.
+
+         Usage, from the repository root:
+             python -m sim.run_main --seconds 30
+             python -m sim.run_main --track course.pgm --mm-per-px 1 \\
+                 --start 300,250,0
+"""
+
+# ---------
+# Imports
+# ---------
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import sim
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Operator scripts: (time in s, action). For the sweep calibration the robot
+# sits on the line and the button is pressed to calibrate, then again to start
+# the run once calibration is done. For calibrating by hand the robot sits on
+# the dark card, then the light card, then the track, with a press for each.
+SCRIPTS = {
+    'auto': ((0.3, 'track'), (1.0, 'press'), (1.5, 'press')),
+    'manual': ((0.3, 'dark'), (1.0, 'press'),
+               (1.7, 'light'), (2.0, 'press'),
+               (2.7, 'track'), (3.0, 'press')),
+}
+
+
+class Runner:
+    def __init__(self, plant, script, stop_s):
+        """
+        Drive 'plant' through the operator 'script' and stop after 'stop_s'
+        seconds of virtual time.
+        """
+        from sim import board
+        self.board = board
+        self.plant = plant
+        self.events = [(int(t * 1000000), action) for t, action in script]
+        self.events.sort()
+        self.stop_us = int(stop_s * 1000000)
+
+    def next_event_us(self):
+        """
+        Return the time of the next scripted event, timer callback or the
+        stop.
+        """
+        next_us = self.stop_us
+        if self.events:
+            next_us = min(self.events[0][0], next_us)
+        timer_us = self.board.next_timer_us()
+        if timer_us is not None:
+            next_us = min(timer_us, next_us)
+        return next_us
+
+    def poll(self):
+        """
+        Bring the plant up to date and play any events which are due. Raises
+        KeyboardInterrupt once the run time is over. Returns True if an
+        interrupt callback was run, since it may have started a task.
+        """
+        board = self.board
+        now = board.clock.now_us
+        board.sync()
+        fired = board.fire_timers()
+        while self.events and self.events[0][0] <= now:
+            action = self.events.pop(0)[1]
+            if action == 'press':
+                fired = board.fire_extint('C13') or fired
+            elif action in ('dark', 'light'):
+                self.plant.surface = action
+            elif action == 'track':
+                self.plant.surface = None
+        if now >= self.stop_us:
+            raise KeyboardInterrupt
+        return fired
+
+    def clock(self, cotask):
+        """
+        Return a cotask clock source which reads the virtual ticks and, each
+        time the scheduler finds no task ready, skips from one scripted event
+        or timer callback to the next, playing each, until one of them starts
+        a task or the next task release comes. The scheduler is then only
+        called again when it has a task to run.
+        """
+        from utime import ticks_diff
+        runner = self
+        clock = self.board.clock
+
+        class SimClock(cotask.TicksClock):
+            virtual = True
+
+            def idle(self, until):
+                # Time of the release, from the ticks read by the scheduler
+                end = clock.now_us + ticks_diff(until, self.ticks())
+                while not runner.poll():
+                    target = min(end, runner.next_event_us())
+                    if target <= clock.now_us:
+                        return
+                    clock.advance_to(target)
+
+        return SimClock()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--seconds', type=float, default=20.0,
+                        help="virtual time to run after power-on")
+    parser.add_argument('--main', default=os.path.join(REPO_DIR, 'main'),
+                        help="task set to run")
+    parser.add_argument('--track', help="PBM/PGM track bitmap (default oval)")
+    parser.add_argument('--mm-per-px', type=float, default=1.0)
+    parser.add_argument('--start', default='0,0,0',
+                        help="start pose x_mm,y_mm,theta_deg for --track")
+    parser.add_argument('--ambient', type=float, default=0.0,
+                        help="ambient light on the IR array in ADC counts")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--flash', help="directory standing in for the board's "
+                                        "filesystem (default a new temporary one)")
+    parser.add_argument('--script', choices=sorted(SCRIPTS), default='auto',
+                        help="operator script: sweep calibration, or the dark "
+                             "and light cards with AUTO_CALIBRATE off")
+    args = parser.parse_args(argv)
+
+    sim.install()
+    if REPO_DIR not in sys.path:
+        sys.path.insert(1, REPO_DIR)
+    from sim.track import Track
+    from sim.romi import Romi
+
+    if args.track:
+        start = tuple(float(v) for v in args.start.split(','))
+        track = Track.from_pnm(args.track, args.mm_per_px, start)
+    else:
+        track = Track.oval()
+    plant = Romi(track, ambient=args.ambient, seed=args.seed)
+    runner = Runner(plant, SCRIPTS[args.script], args.seconds)
+
+    import cotask
+    cotask.set_clock(runner.clock(cotask))
+
+    main_path = os.path.abspath(args.main)
+    with open(main_path) as file:
+        code = compile(file.read(), main_path, 'exec')
+    if args.flash:
+        os.makedirs(args.flash, exist_ok=True)
+        os.chdir(args.flash)
+    else:
+        os.chdir(tempfile.mkdtemp(prefix='romi_flash_'))
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    exec(code, {'__name__': '__main__', '__file__': main_path})
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+
+    virtual = runner.board.clock.now_us / 1000000
+    x, y, theta = plant.pose()
+    print()
+    print("Virtual time {:8.2f} s   wall time {:6.2f} s   speed-up {:6.0f}x"
+          .format(virtual, wall, virtual / wall if wall else 0))
+    # On a busy host the wall time includes time spent running other
+    # processes; the speed-up on CPU time is what the simulator itself costs
+    print("                         CPU time  {:6.2f} s   speed-up {:6.0f}x"
+          .format(cpu, virtual / cpu if cpu else 0))
+    print("Distance {:8.0f} mm   final pose ({:.0f}, {:.0f}) mm {:.1f} deg"
+          .format(plant.distance_mm, x, y, theta))
+    if plant.frames:
+        print("Line under IR array in {:.1f} % of {:d} IR frames"
+              .format(100 * plant.frames_on_line / plant.frames, plant.frames))
+    if plant.collisions:
+        print("Bump sensor contacts: {:d}".format(plant.collisions))
+
+
+if __name__ == '__main__':
+    main()
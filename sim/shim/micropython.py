@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 2026
+
+@authors: Charith Sunku and Tomas Franco
+
+Purpose: Host-side stand-in for the MicroPython micropython module.
+         The code emitters are no-ops under CPython, so the decorators simply
+         return the function they are given.
+"""
+
+
+def native(fun):
+    """
+    Stand-in for the native code emitter decorator.
+    """
+    return fun
+
+
+def viper(fun):
+    """
+    Stand-in for the viper code emitter decorator.
+    """
+    return fun
+
+
+def const(value):
+    """
+    Stand-in for compile-time constants.
+    """
+    return value
+
+
+def alloc_emergency_exception_buf(size):
+    """
+    Nothing needs reserving on the host.
+    """
+    return None
+
+
+def schedule(fun, arg):
+    """
+    Run a soft callback immediately; there are no hard interrupts on the host.
+    """
+    fun(arg)
+
+
+def mem_info(verbose=None):
+    """
+    Print a short placeholder in place of the heap report.
+    """
+    print("mem: host simulator")
@@ -0,0 +1,509 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 2026
+
+@authors: Charith Sunku and Tomas Franco
+
+Purpose: Host-side stand-in for the parts of the MicroPython pyb module used
+         by the Romi drivers. This module provides:
+             - Pin, ExtInt, Timer/TimerChannel, ADC and I2C classes which keep
+               their state in sim.board so the plant model can see it.
+             - delay(), udelay(), millis(), micros() and wfi() on the virtual
+               clock, plus the interrupt enable/disable helpers.
+         Peripheral accesses are charged a rough execution cost so that
+         run times and lateness measured by cotask are not all zero.
+"""
+
+# ---------
+# Imports
+# ---------
+from sim import board
+
+# Approximate costs of peripheral accesses on the Nucleo, in microseconds.
+ADC_READ_US = 12
+ADC_CONVERT_US = 5      # One conversion within ADC.read_timed_multi()
+PIN_ACCESS_US = 1
+I2C_OVERHEAD_US = 30
+
+
+def _pin_name(pin_id):
+    """
+    Normalise 'A8', 'PA8' and Pin objects to the same short name.
+    """
+    if isinstance(pin_id, Pin):
+        return pin_id._name
+    name = str(pin_id)
+    if len(name) > 2 and name[0] == 'P' and name[1].isalpha():
+        name = name[1:]
+    return name
+
+
+# ---------------------------------
+# Pin and External Interrupts
+# ---------------------------------
+class _CpuPins:
+    """
+    Attribute access helper so that Pin.cpu.C13 returns the C13 pin.
+    """
+    def __getattr__(self, name):
+        return Pin(name)
+
+
+class Pin:
+    IN = 0
+    OUT = OUT_PP = 1
+    OUT_OD = 2
+    AF_PP = 3
+    AF_OD = 4
+    ANALOG = 5
+    PULL_NONE = 0
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 1
+    IRQ_RISING = 2
+
+    cpu = _CpuPins()
+
+    def __new__(cls, pin_id, *args, **kwargs):
+        # One object per physical pin, as on the microcontroller
+        name = _pin_name(pin_id)
+        pin = board.pins.get(name)
+        if pin is None:
+            pin = super().__new__(cls)
+            pin._name = name
+            pin._mode = Pin.IN
+            pin._pull = Pin.PULL_NONE
+            pin._value = 0
+            pin.t_change_us = 0
+            pin.duty = 0.0
+            board.pins[name] = pin
+        return pin
+
+    def __init__(self, pin_id, mode=None, pull=None, *, value=None,
+                 af=None, alt=None):
+        if mode is not None:
+            self._mode = mode
+        if pull is not None:
+            self._pull = pull
+        if value is not None:
+            self.value(value)
+
+    def init(self, mode=None, pull=None, *, value=None, af=None, alt=None):
+        Pin.__init__(self, self._name, mode, pull, value=value)
+
+    def value(self, new_value=None):
+        """
+        Read the pin, or drive it when 'new_value' is given.
+        """
+        board.clock.advance(PIN_ACCESS_US)
+        if new_value is None:
+            return self._value
+        new_value = 1 if new_value else 0
+        if new_value != self._value:
+            board.sync()
+            self._value = new_value
+            self.t_change_us = board.clock.now_us
+
+    def high(self):
+        self.value(1)
+
+    def low(self):
+        self.value(0)
+
+    on = high
+    off = low
+
+    def __call__(self, new_value=None):
+        return self.value(new_value)
+
+    def name(self):
+        return self._name
+
+    def pin(self):
+        return int(self._name[1:])
+
+    def __repr__(self):
+        return "Pin(Pin.cpu.{:s})".format(self._name)
+
+
+class ExtInt:
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+    IRQ_RISING_FALLING = 3
+    EVT_RISING = 4
+    EVT_FALLING = 5
+    EVT_RISING_FALLING = 6
+
+    def __init__(self, pin, mode, pull, callback):
+        self._pin = Pin(pin)
+        self._mode = mode
+        self.enabled = True
+        board.extints[self._pin._name] = (self, callback)
+
+    def line(self):
+        return self._pin.pin()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def swint(self):
+        board.fire_extint(self._pin._name)
+
+
+# ---------------------------------
+# Timers, PWM and Encoder Counting
+# ---------------------------------
+class TimerChannel:
+    def __init__(self, timer, channel, mode, pin):
+        self._timer = timer
+        self._channel = channel
+        self._mode = mode
+        self._pin = pin
+        self._percent = 0.0
+
+    def pulse_width_percent(self, percent=None):
+        """
+        Read or set the PWM duty cycle, which the plant reads from the pin.
+        """
+        if percent is None:
+            return self._percent
+        board.sync()
+        self._percent = max(0.0, min(100.0, float(percent)))
+        if self._pin is not None:
+            self._pin.duty = self._percent
+
+    def pulse_width(self, width=None):
+        if width is None:
+            return int(self._percent * self._timer._period / 100)
+        self.pulse_width_percent(100.0 * width / (self._timer._period or 1))
+
+    def capture(self, value=None):
+        return 0
+
+    compare = capture
+
+    def callback(self, fun):
+        pass
+
+
+class Timer:
+    PWM = 0
+    PWM_INVERTED = 1
+    OC_TIMING = 2
+    OC_ACTIVE = 3
+    OC_INACTIVE = 4
+    OC_TOGGLE = 5
+    OC_FORCED_ACTIVE = 6
+    OC_FORCED_INACTIVE = 7
+    IC = 8
+    ENC_A = 9
+    ENC_B = 10
+    ENC_AB = 11
+    UP = 0
+    DOWN = 1
+    CENTER = 2
+    HIGH = 0
+    LOW = 2
+    RISING = 0
+    FALLING = 2
+    BOTH = 10
+
+    def __new__(cls, id, *args, **kwargs):
+        # Re-creating a timer object reconfigures the same hardware timer
+        tim = board.timers.get(id)
+        if tim is None:
+            tim = super().__new__(cls)
+            tim._id = id
+            tim._channels = {}
+            tim._callback = None
+            tim._enc_pin = None
+            tim._wraps = 0
+            tim._count_offset = 0
+            tim._next_us = 0
+            tim._sr = 0  # Status register, read through the stm shim
+            board.timers[id] = tim
+        return tim
+
+    def __init__(self, id, *, freq=None, period=None, prescaler=None,
+                 callback=None, **kwargs):
+        if freq is not None or period is not None:
+            self.init(freq=freq, period=period, prescaler=prescaler,
+                      callback=callback)
+        elif not hasattr(self, '_freq'):
+            self.init()
+
+    def init(self, *, freq=None, period=None, prescaler=None, callback=None,
+             **kwargs):
+        self._freq = freq
+        self._period = period if period is not None else 0xFFFF
+        self._prescaler = prescaler if prescaler is not None else 0
+        self._next_us = board.clock.now_us + self._period_us()
+        if callback is not None:
+            self._callback = callback
+        self._schedule()
+
+    def _period_us(self):
+        """
+        Return the time between update events of a timer set by frequency.
+        """
+        return max(1, int(1000000 // self._freq)) if self._freq else 0
+
+    def _schedule(self):
+        """
+        Register the timer with the board if its update callback should be run
+        on virtual time, that is if it counts at a set freq; encoder timers
+        run theirs from _check_wrap().
+        """
+        if self._freq and self._callback is not None:
+            self._update_us = self._period_us()
+            board.schedule_timer(self)
+        else:
+            board.unschedule_timer(self._id)
+
+    def deinit(self):
+        """
+        Stop the timer, which turns off every PWM output it drives.
+        """
+        for ch in self._channels.values():
+            if ch._mode in (Timer.PWM, Timer.PWM_INVERTED):
+                ch.pulse_width_percent(0)
+        self._callback = None
+        board.unschedule_timer(self._id)
+
+    def channel(self, channel, mode=None, pin=None, *,
+                pulse_width_percent=None, pulse_width=None, **kwargs):
+        if mode is None:
+            return self._channels.get(channel)
+        pin_obj = Pin(pin) if pin is not None else None
+        ch = TimerChannel(self, channel, mode, pin_obj)
+        self._channels[channel] = ch
+        if mode == Timer.ENC_AB and channel == 1 and pin_obj is not None:
+            self._enc_pin = pin_obj._name
+            board.encoders[self._enc_pin] = self
+        if pulse_width_percent is not None:
+            ch.pulse_width_percent(pulse_width_percent)
+        elif pulse_width is not None:
+            ch.pulse_width(pulse_width)
+        return ch
+
+    def _raw_count(self):
+        board.sync()
+        if self._enc_pin is None or board.plant is None:
+            return 0
+        return board.plant.encoder_count(self._enc_pin)
+
+    def counter(self, value=None):
+        """
+        Return the 16-bit counter, or load it with 'value'.
+        """
+        if value is None:
+            return (self._raw_count() + self._count_offset) & self._period
+        self._count_offset = value - self._raw_count()
+
+    def _check_wrap(self, count):
+        """
+        Called by the plant with the encoder's raw count; runs the update
+        callback once for each time the counter wraps in either direction.
+        """
+        wraps = (count + self._count_offset) // (self._period + 1)
+        while self._wraps != wraps:
+            self._wraps += 1 if wraps > self._wraps else -1
+            if self._callback is not None:
+                self._callback(self)
+
+    def callback(self, fun):
+        self._callback = fun
+        self._schedule()
+
+    def freq(self, value=None):
+        if value is None:
+            return self._freq
+        self._freq = value
+        self._next_us = board.clock.now_us + self._period_us()
+        self._schedule()
+
+    def period(self, value=None):
+        if value is None:
+            return self._period
+        self._period = value
+
+    def prescaler(self, value=None):
+        if value is None:
+            return self._prescaler
+        self._prescaler = value
+
+    def source_freq(self):
+        return 80000000
+
+
+# ---------------------------------
+# Analog Inputs
+# ---------------------------------
+class ADC:
+    def __init__(self, pin):
+        self._pin = Pin(pin)
+
+    def read(self):
+        """
+        Return a 12-bit conversion of the voltage the plant puts on the pin.
+        """
+        board.clock.now_us += ADC_READ_US
+        plant = board.plant
+        if plant is None:
+            return 0
+        return plant.adc_read(self._pin._name)
+
+    def read_timed(self, buf, timer):
+        ADC.read_timed_multi((self,), (buf,), timer)
+
+    @staticmethod
+    def read_timed_multi(adcs, bufs, timer):
+        """
+        Fill each buffer with conversions of its ADC, converting every ADC in
+        turn on each tick of 'timer'. Blocks until done, like the real one.
+        Returns False if the conversions for one tick take longer than a tick.
+        """
+        clock = board.clock
+        plant = board.plant
+        tick = 1000000 / timer.freq()
+        start = clock.now_us
+        names = [adc._pin._name for adc in adcs]
+        for idx in range(len(bufs[0])):
+            clock.advance_to(start + int((idx + 1) * tick))
+            if plant is not None:
+                plant.adc_read_multi(names, bufs, idx, ADC_CONVERT_US)
+                continue
+            for buf in bufs:
+                clock.now_us += ADC_CONVERT_US
+                buf[idx] = 0
+        return len(adcs) * ADC_CONVERT_US <= tick
+
+
+# ---------------------------------
+# I2C Controller
+# ---------------------------------
+class I2C:
+    CONTROLLER = MASTER = 0
+    PERIPHERAL = SLAVE = 1
+
+    def __init__(self, bus, mode=None, **kwargs):
+        self._bus = bus
+        self._baudrate = 400000
+        self._pointers = {}   # Register pointer set by send(), per address
+        if mode is not None:
+            self.init(mode, **kwargs)
+
+    def init(self, mode, *, addr=0x12, baudrate=400000, gencall=False,
+             dma=False):
+        self._baudrate = baudrate
+
+    def deinit(self):
+        pass
+
+    def _transfer(self, addr, nbytes, overhead=3):
+        # Address + register + repeated start + data, 9 bits per byte; a
+        # plain send() or recv() only has the address byte besides the data
+        bits = 9 * (nbytes + overhead)
+        board.clock.advance(I2C_OVERHEAD_US + bits * 1000000 // self._baudrate)
+        board.sync()
+        device = board.i2c_devices.get(addr)
+        if device is None:
+            raise OSError(116)   # ETIMEDOUT, as pyb reports a missing device
+        return device
+
+    def is_ready(self, addr):
+        return addr in board.i2c_devices
+
+    def scan(self):
+        return sorted(board.i2c_devices)
+
+    def mem_read(self, data, addr, memaddr, *, timeout=5000, addr_size=8):
+        """
+        Read 'data' bytes (or into buffer 'data') from register 'memaddr'.
+        """
+        nbytes = data if isinstance(data, int) else len(data)
+        device = self._transfer(addr, nbytes)
+        values = device.read(memaddr, nbytes)
+        if isinstance(data, int):
+            return bytes(values)
+        data[:] = values
+        return data
+
+    def send(self, data, addr=0x00, *, timeout=5000):
+        """
+        Write an integer or buffer to device 'addr'. The first byte sets the
+        device's register pointer and any others are written from there.
+        """
+        if isinstance(data, int):
+            data = bytes((data & 0xFF,))
+        device = self._transfer(addr, len(data), 1)
+        self._pointers[addr] = data[0]
+        if len(data) > 1:
+            device.write(data[0], bytes(data[1:]))
+
+    def recv(self, data, addr=0x00, *, timeout=5000):
+        """
+        Read 'data' bytes (or into buffer 'data') from device 'addr', starting
+        at the register pointer set by the last send().
+        """
+        nbytes = data if isinstance(data, int) else len(data)
+        device = self._transfer(addr, nbytes, 1)
+        values = device.read(self._pointers.get(addr, 0), nbytes)
+        if isinstance(data, int):
+            return bytes(values)
+        data[:] = values
+        return data
+
+    def mem_write(self, data, addr, memaddr, *, timeout=5000, addr_size=8):
+        """
+        Write an integer or buffer to register 'memaddr'.
+        """
+        if isinstance(data, int):
+            data = bytes((data & 0xFF,))
+        device = self._transfer(addr, len(data))
+        device.write(memaddr, bytes(data))
+
+
+# ---------------------------------
+# Time and Interrupt Helpers
+# ---------------------------------
+def delay(ms):
+    board.clock.advance(ms * 1000)
+
+
+def udelay(us):
+    board.clock.advance(us)
+
+
+def millis():
+    return board.clock.read() // 1000
+
+
+def micros():
+    return board.clock.read()
+
+
+def elapsed_millis(start):
+    return millis() - start
+
+
+def elapsed_micros(start):
+    return micros() - start
+
+
+def wfi():
+    """
+    Sleep until the next SysTick interrupt, one millisecond boundary away.
+    """
+    board.clock.advance_to((board.clock.now_us // 1000 + 1) * 1000)
+
+
+def disable_irq():
+    return True
+
+
+def enable_irq(state=True):
+    pass
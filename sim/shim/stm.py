@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 2026
+
+@authors: Charith Sunku and Tomas Franco
+
+Purpose: Host-side stand-in for the parts of the MicroPython stm module used
+         by the Romi drivers: the timer base addresses and status register
+         offset, and mem32 access to the status registers of the shim timers.
+         In the simulator a timer's update interrupt runs as soon as it
+         wraps, so its update flag is never left pending unless a test sets
+         it.
+"""
+
+# ---------
+# Imports
+# ---------
+from sim import board
+
+# Timer base addresses on the STM32L476, and the status register offset.
+TIM1 = 0x40012C00
+TIM2 = 0x40000000
+TIM3 = 0x40000400
+TIM4 = 0x40000800
+TIM5 = 0x40000C00
+TIM6 = 0x40001000
+TIM7 = 0x40001400
+TIM8 = 0x40013400
+TIM_SR = 0x10
+
+_TIMER_IDS = {TIM1: 1, TIM2: 2, TIM3: 3, TIM4: 4, TIM5: 5, TIM6: 6,
+              TIM7: 7, TIM8: 8}
+
+
+class _Mem32:
+    """
+    Word access to the timer status registers, which are kept by the shim
+    Timer objects. Any other address raises ValueError.
+    """
+    def _timer(self, addr):
+        tim = board.timers.get(_TIMER_IDS.get(addr - TIM_SR))
+        if tim is None:
+            raise ValueError("no simulated register at 0x{:08x}".format(addr))
+        return tim
+
+    def __getitem__(self, addr):
+        return self._timer(addr)._sr
+
+    def __setitem__(self, addr, value):
+        # Status flags are cleared by writing 0 and left alone by writing 1
+        tim = self._timer(addr)
+        tim._sr &= value
+
+
+mem32 = _Mem32()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 2026
+
+@authors: Charith Sunku and Tomas Franco
+
+Purpose: Host-side stand-in for the MicroPython utime module.
+         Ticks come from the simulator's virtual clock and wrap with the same
+         30-bit period as on the Nucleo, so code relying on ticks_diff() and
+         ticks_add() behaves as it does on the robot.
+"""
+
+# ---------
+# Imports
+# ---------
+from sim import board
+
+_TICKS_PERIOD = 1 << 30
+_TICKS_MAX = _TICKS_PERIOD - 1
+_TICKS_HALF = _TICKS_PERIOD // 2
+
+# The board's clock is the same object for the whole run; reads are inlined
+# here as they're the most frequent call in the simulator
+_clock = board.clock
+
+
+def ticks_us():
+    """
+    Return the virtual time in microseconds, wrapped to the ticks period.
+    Like every clock read, this charges the clock's read cost.
+    """
+    clock = _clock
+    clock.now_us += clock.read_cost_us
+    return clock.now_us & _TICKS_MAX
+
+
+def ticks_ms():
+    """
+    Return the virtual time in milliseconds, wrapped to the ticks period.
+    """
+    return (board.clock.read() // 1000) & _TICKS_MAX
+
+
+def ticks_cpu():
+    """
+    Return the highest resolution tick available, here microseconds.
+    """
+    return ticks_us()
+
+
+def ticks_diff(ticks1, ticks2):
+    """
+    Return the signed difference ticks1 - ticks2 with wraparound handled.
+    """
+    return ((ticks1 - ticks2 + _TICKS_HALF) & _TICKS_MAX) - _TICKS_HALF
+
+
+def ticks_add(ticks, delta):
+    """
+    Offset a ticks value by 'delta', which may be negative.
+    """
+    return (ticks + delta) & _TICKS_MAX
+
+
+def sleep_us(us):
+    """
+    Spend 'us' microseconds of virtual time.
+    """
+    board.clock.advance(us)
+
+
+def sleep_ms(ms):
+    """
+    Spend 'ms' milliseconds of virtual time.
+    """
+    board.clock.advance(ms * 1000)
+
+
+def sleep(seconds):
+    """
+    Spend 'seconds' seconds of virtual time.
+    """
+    board.clock.advance(seconds * 1000000)
+
+
+def time():
+    """
+    Return whole seconds of virtual time since start-up.
+    """
+    return board.clock.now_us // 1000000
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 2026
+
+@authors: Charith Sunku and Tomas Franco
+
+Purpose: Track bitmaps for the Romi simulator.
+         A track is a greyscale bitmap of line darkness (0 = white surface,
+         255 = black tape) in world millimetres, plus the robot's start pose and
+         any walls the bump sensors can hit. Tracks can be loaded from PBM/PGM
+         files or generated, e.g. the oval used by default.
+"""
+
+# ---------
+# Imports
+# ---------
+import math
+
+
+# ----------------------------------
+# Track Class: Bitmap of the Game Surface
+# ----------------------------------
+class Track:
+    def __init__(self, width_px, height_px, mm_per_px=1.0, data=None,
+                 start=(0.0, 0.0, 0.0), walls=()):
+        """
+        Create a track bitmap.
+        Args:
+            width_px, height_px (int): Bitmap size in pixels.
+            mm_per_px (float): World size of one pixel.
+            data (bytearray): Row-major darkness values, top row first.
+            start (tuple): Start pose (x_mm, y_mm, theta_deg), theta measured
+                counter-clockwise from the +x axis.
+            walls (iterable): Axis-aligned wall rectangles
+                (x_min, y_min, x_max, y_max) in millimetres.
+        """
+        self.width = width_px
+        self.height = height_px
+        self.mm_per_px = mm_per_px
+        self.data = data if data is not None else bytearray(width_px * height_px)
+        self.start = start
+        self.walls = list(walls)
+
+    def darkness(self, x_mm, y_mm):
+        """
+        Return the darkness (0-1) under world point (x_mm, y_mm).
+        Points off the bitmap read as white.
+        """
+        col = int(x_mm / self.mm_per_px)
+        row = self.height - 1 - int(y_mm / self.mm_per_px)
+        if 0 <= col < self.width and 0 <= row < self.height:
+            return self.data[row * self.width + col] / 255
+        return 0.0
+
+    def in_wall(self, x_mm, y_mm):
+        """
+        Return True if world point (x_mm, y_mm) lies inside a wall.
+        """
+        for x0, y0, x1, y1 in self.walls:
+            if x0 <= x_mm <= x1 and y0 <= y_mm <= y1:
+                return True
+        return False
+
+    def stamp(self, x_mm, y_mm, radius_mm):
+        """
+        Paint a filled black disk, used to draw lines point by point.
+        """
+        res = self.mm_per_px
+        r_px = radius_mm / res
+        c_col = x_mm / res
+        c_row = self.height - 1 - y_mm / res
+        for row in range(max(0, int(c_row - r_px)),
+                         min(self.height, int(c_row + r_px) + 1)):
+            half = r_px * r_px - (row - c_row) ** 2
+            if half < 0:
+                continue
+            half = math.sqrt(half)
+            c0 = max(0, int(c_col - half))
+            c1 = min(self.width, int(c_col + half) + 1)
+            if c1 > c0:
+                base = row * self.width
+                self.data[base + c0:base + c1] = b'\xff' * (c1 - c0)
+
+    def draw_polyline(self, points, width_mm=19.0):
+        """
+        Draw a line of the given width through a list of (x_mm, y_mm) points.
+        """
+        step = self.mm_per_px / 2
+        radius = width_mm / 2
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            length = math.hypot(x1 - x0, y1 - y0)
+            n = max(1, int(length / step))
+            for idx in range(n + 1):
+                frac = idx / n
+                self.stamp(x0 + (x1 - x0) * frac, y0 + (y1 - y0) * frac, radius)
+
+    @classmethod
+    def oval(cls, straight_mm=1000.0, radius_mm=300.0, line_mm=19.0,
+             margin_mm=250.0, mm_per_px=2.0):
+        """
+        Generate a closed oval: two straights joined by semicircles.
+        The robot starts at the beginning of the bottom straight heading +x.
+        """
+        width = straight_mm + 2 * (radius_mm + margin_mm)
+        height = 2 * (radius_mm + margin_mm)
+        track = cls(int(width / mm_per_px), int(height / mm_per_px), mm_per_px)
+        x0 = margin_mm + radius_mm
+        x1 = x0 + straight_mm
+        yc = height / 2
+        points = []
+        n_arc = int(math.pi * radius_mm / 10)
+        points.append((x0, yc - radius_mm))
+        points.append((x1, yc - radius_mm))
+        for idx in range(1, n_arc + 1):
+            ang = -math.pi / 2 + math.pi * idx / n_arc
+            points.append((x1 + radius_mm * math.cos(ang),
+                           yc + radius_mm * math.sin(ang)))
+        points.append((x0, yc + radius_mm))
+        for idx in range(1, n_arc + 1):
+            ang = math.pi / 2 + math.pi * idx / n_arc
+            points.append((x0 + radius_mm * math.cos(ang),
+                           yc + radius_mm * math.sin(ang)))
+        track.draw_polyline(points, line_mm)
+        track.start = (x0 + 50.0, yc - radius_mm, 0.0)
+        return track
+
+    @classmethod
+    def from_pnm(cls, path, mm_per_px=1.0, start=(0.0, 0.0, 0.0), walls=()):
+        """
+        Load a binary PBM (P4) or PGM (P5) image. In a PBM, set bits are black;
+        in a PGM, darker grey values are darker line.
+        """
+        with open(path, 'rb') as file:
+            raw = file.read()
+        fields = []
+        pos = 0
+        while len(fields) < (3 if raw[:2] == b'P4' else 4):
+            while raw[pos:pos + 1].isspace():
+                pos += 1
+            if raw[pos:pos + 1] == b'#':
+                while raw[pos:pos + 1] not in (b'\n', b''):
+                    pos += 1
+                continue
+            end = pos
+            while not raw[end:end + 1].isspace():
+                end += 1
+            fields.append(raw[pos:end])
+            pos = end
+        pos += 1
+        magic = fields[0]
+        width, height = int(fields[1]), int(fields[2])
+        data = bytearray(width * height)
+        if magic == b'P4':
+            stride = (width + 7) // 8
+            for row in range(height):
+                line = raw[pos + row * stride:pos + (row + 1) * stride]
+                for col in range(width):
+                    if line[col >> 3] & (0x80 >> (col & 7)):
+                        data[row * width + col] = 255
+        elif magic == b'P5':
+            maxval = int(fields[3])
+            for idx in range(width * height):
+                data[idx] = 255 - raw[pos + idx] * 255 // maxval
+        else:
+            raise ValueError("Only binary PBM (P4) and PGM (P5) are supported.")
+        return cls(width, height, mm_per_px, data, start, walls)
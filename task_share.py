@@ -62,10 +62,24 @@ class BaseShare:
         self._type_code = type_code
         self._thread_protect = thread_protect
 
+        # Tasks to be started when data is put into this queue or share
+        self._wakes = ()
+
         # Add this queue to the global share and queue list
         share_list.append (self)
 
 
+    ## Start a task whenever data is put into this queue or share.
+    #
+    #  Each time @c put() is called, the task's @c go() method is called, so
+    #  a task without a period can be run whenever new data arrives rather
+    #  than polling for it. More than one task can be woken by the same
+    #  queue or share. 
+    #  @param task The task (a @c cotask.Task) to be started
+    def wake_on_put (self, task):
+        self._wakes += (task,)
+
+
 ## A queue which is used to transfer data from one task to another.
 #
 #  If parameter 'thread_protect' is @c True when a queue is created, transfers
@@ -196,6 +210,10 @@ class Queue (BaseShare):
         if self._thread_protect and not in_ISR:
             pyb.enable_irq (_irq_state)
 
+        # Start any tasks waiting for new data
+        for task in self._wakes:
+            task.go (in_ISR)
+
 
     ## Read an item from the queue.
     # 
@@ -354,6 +372,9 @@ class Share (BaseShare):
 
         self._buffer = array.array (type_code, [0])
 
+        # The time stamp given with the data, if any
+        self._stamp = 0
+
         self._name = str (name) if name != None \
             else 'Share' + str (Share.ser_num)
         Share.ser_num += 1
@@ -367,19 +388,28 @@ class Share (BaseShare):
     #  the same data.
     #  @param data The data to be put into this share
     #  @param in_ISR Set this to True if calling from within an ISR
+    #  @param stamp A time stamp, such as the @c utime.ticks_us() time at
+    #         which the data was measured, which is kept with the data until
+    #         another stamp is given. See @c stamp()
     @micropython.native
-    def put (self, data, in_ISR = False):
+    def put (self, data, in_ISR = False, stamp = None):
 
         # Disable interrupts before writing the data
         if self._thread_protect and not in_ISR:
             irq_state = pyb.disable_irq ()
 
         self._buffer[0] = data
+        if stamp is not None:
+            self._stamp = stamp
 
         # Re-enable interrupts
         if self._thread_protect and not in_ISR:
             pyb.enable_irq (irq_state)
 
+        # Start any tasks waiting for new data
+        for task in self._wakes:
+            task.go (in_ISR)
+
 
     ## Read an item of data from the share.
     # 
@@ -402,6 +432,15 @@ class Share (BaseShare):
         return (to_return)
 
 
+    ## Read the time stamp most recently put into the share with its data.
+    #
+    #  Passing stamps along with data from share to share lets a task which
+    #  finally uses the data find out how old it is.
+    #  @return The time stamp, or 0 if none has been given
+    def stamp (self):
+        return self._stamp
+
+
     ## Puts diagnostic information about the share into a string.
     #
     #  Shares are pretty simple, so we just put the name and type. 
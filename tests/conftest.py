@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 2026
+
+@authors: Charith Sunku and Tomas Franco
+
+Purpose: pytest set up for the host-side tests. The simulator's shims stand
+         in for pyb, utime and micropython, so cotask and the drivers import
+         unmodified on a PC.
+"""
+
+# ---------
+# Imports
+# ---------
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+import sim
+
+sim.install()
@@ -0,0 +1,500 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 2026
+
+@authors: Charith Sunku and Tomas Franco
+
+Purpose: Tests for the IR array driver. The ADCs and emitter pins are the
+         simulator's shims, with a stand-in plant whose readings each test
+         sets: one value per sensor while its bank's emitters are on, and
+         another while they're off.
+"""
+
+# ---------
+# Imports
+# ---------
+import math
+import statistics
+
+import pytest
+
+from sim import board
+from IR_sensor import (IR_Array, IR_ONE, IR_SHIFT, IR_PITCH_MM, SCAN_FULL,
+                       SCAN_WINDOW, DIFFERENTIAL, DIFFERENTIAL_BANKED,
+                       ADC_CONVERT_US, SETTLE_US, ADC_MAX, SWEEP_SETTLE,
+                       SWEEP_MIN_CONTRAST)
+
+IR_PINS = ("C2", "C3", "A0", "A1", "A4", "B0", "C1", "C0", "A6", "A7", "C5",
+           "C4", "B1")
+EVEN_PIN = "B14"
+ODD_PIN = "B13"
+N = len(IR_PINS)
+
+
+class FakePlant:
+    """
+    Plant with fixed readings: 'lit' for a sensor while the bank lighting it
+    is on, 'ambient' otherwise. Sensors 1, 3, ... (even indices) are lit by
+    the ODD bank. Every conversion is logged as (index, ODD on, EVEN on).
+    """
+    def __init__(self):
+        self.lit = [0] * N
+        self.ambient = [0] * N
+        self.reads = []
+
+    def sync(self):
+        pass
+
+    def _value(self, name):
+        idx = IR_PINS.index(name)
+        odd = board.pins[ODD_PIN]._value
+        even = board.pins[EVEN_PIN]._value
+        self.reads.append((idx, odd, even))
+        return self.lit[idx] if (even if idx % 2 else odd) else self.ambient[idx]
+
+    def adc_read(self, name):
+        return self._value(name)
+
+    def adc_read_multi(self, names, bufs, index, convert_us):
+        for name, buf in zip(names, bufs):
+            board.clock.now_us += convert_us
+            buf[index] = self._value(name)
+
+
+def make_array(**kwargs):
+    """
+    Return an IR array on a freshly reset board, and its plant.
+    """
+    board.reset()
+    plant = FakePlant()
+    board.attach(plant)
+    return IR_Array(IR_PINS, EVEN_PIN, ODD_PIN, **kwargs), plant
+
+
+def calibrate(array, dark=3000, light=1000):
+    """
+    Give every sensor the same dark and light calibrations.
+    """
+    array.darkValue = [dark] * N
+    array.lightValue = [light] * N
+    array._computeScales()
+
+
+def read(array, plant, lit, **kwargs):
+    """
+    Take and normalize a reading with the plant reading 'lit'.
+    """
+    plant.lit = list(lit)
+    array.start(**kwargs)
+    while not array.collect():
+        pass
+    array.normalize()
+
+
+def line_at(idx, dark=3000, light=1000):
+    """
+    Return readings with the line under sensor 'idx' alone.
+    """
+    return [dark if pos == idx else light for pos in range(N)]
+
+
+def test_window_follows_the_line():
+    array, plant = make_array(window=2, full_every=10)
+    calibrate(array)
+    read(array, plant, line_at(6))
+    assert array.getScanMode() == SCAN_FULL
+    plant.reads.clear()
+    read(array, plant, line_at(7))
+    assert array.getScanMode() == SCAN_WINDOW
+    # Five sensors around the line at sensor 7 (index 6)
+    assert sorted({idx for idx, odd, even in plant.reads}) == [4, 5, 6, 7, 8]
+    assert array.peak_idx == 7
+    plant.reads.clear()
+    read(array, plant, line_at(7))
+    assert sorted({idx for idx, odd, even in plant.reads}) == [5, 6, 7, 8, 9]
+
+
+def test_window_is_clamped_at_the_array_ends():
+    array, plant = make_array(window=2, full_every=10)
+    calibrate(array)
+    read(array, plant, line_at(0))
+    plant.reads.clear()
+    read(array, plant, line_at(0))
+    assert sorted({idx for idx, odd, even in plant.reads}) == [0, 1, 2, 3, 4]
+
+
+def test_lost_line_falls_back_to_full_scan():
+    array, plant = make_array(window=2, full_every=10)
+    calibrate(array)
+    read(array, plant, line_at(6))
+    read(array, plant, [1000] * N)
+    assert array.getScanMode() == SCAN_WINDOW
+    assert not array.isLinePresent()
+    plant.reads.clear()
+    read(array, plant, line_at(12))
+    assert array.getScanMode() == SCAN_FULL
+    assert len({idx for idx, odd, even in plant.reads}) == N
+    assert array.isLinePresent()
+
+
+def test_full_scan_every_few_readings():
+    array, plant = make_array(window=2, full_every=3)
+    calibrate(array)
+    modes = []
+    for count in range(7):
+        read(array, plant, line_at(6))
+        modes.append(array.getScanMode())
+    assert modes == [SCAN_FULL, SCAN_WINDOW, SCAN_WINDOW, SCAN_FULL,
+                     SCAN_WINDOW, SCAN_WINDOW, SCAN_FULL]
+
+
+def test_calibration_readings_scan_every_sensor():
+    array, plant = make_array(window=2, full_every=10)
+    calibrate(array)
+    read(array, plant, line_at(6))
+    read(array, plant, line_at(6), full=True)
+    assert array.getScanMode() == SCAN_FULL
+
+
+def test_scan_mode_describes_the_collected_reading():
+    array, plant = make_array(window=2, full_every=10,
+                              sampling=DIFFERENTIAL_BANKED)
+    calibrate(array)
+    read(array, plant, line_at(6))
+    read(array, plant, line_at(6))
+    assert array.getScanMode() == SCAN_WINDOW
+    # A full scan started, but not yet collected, leaves the mode alone
+    array.start(full=True)
+    assert array.getScanMode() == SCAN_WINDOW
+    assert not array.collect()
+    assert array.getScanMode() == SCAN_WINDOW
+    assert array.collect()
+    assert array.getScanMode() == SCAN_FULL
+
+
+def test_position_of_a_single_dark_sensor():
+    array, plant = make_array()
+    calibrate(array)
+    read(array, plant, line_at(6))
+    assert array.isLinePresent()
+    assert array.getPosition() == 0.0
+    read(array, plant, line_at(9))
+    assert array.getPosition() == 3 * IR_PITCH_MM
+
+
+def test_parabolic_offset_towards_the_darker_neighbour():
+    array, plant = make_array()
+    calibrate(array)
+    lit = line_at(6)
+    lit[7] = 2000  # Half way between the calibrations
+    read(array, plant, lit)
+    # 0.5 * (1/2 - 0) / (2 - 0 - 1/2) of a pitch towards sensor 8
+    assert array.getPosition() == pytest.approx(IR_PITCH_MM / 6, abs=1e-2)
+
+
+def test_parabolic_offset_at_the_array_ends():
+    # The missing neighbour past each end counts as reading light
+    array, plant = make_array()
+    calibrate(array)
+    lit = line_at(0)
+    lit[1] = 2000
+    read(array, plant, lit)
+    assert array.getPosition() == pytest.approx(-6 * IR_PITCH_MM
+                                                + IR_PITCH_MM / 6, abs=1e-2)
+    lit = line_at(N - 1)
+    lit[N - 2] = 2000
+    read(array, plant, lit)
+    assert array.getPosition() == pytest.approx(6 * IR_PITCH_MM
+                                                - IR_PITCH_MM / 6, abs=1e-2)
+
+
+def test_flat_peak_is_centred():
+    array, plant = make_array()
+    calibrate(array)
+    lit = [1000] * N
+    lit[5] = lit[6] = lit[7] = 3000
+    read(array, plant, lit)
+    assert array.getPosition() == 0.0
+    lit = [1000] * N
+    lit[6] = lit[7] = 3000
+    lit[8] = 2000
+    read(array, plant, lit)
+    assert array.getPosition() == pytest.approx(0.5 * IR_PITCH_MM
+                                                + IR_PITCH_MM / 6, abs=1e-2)
+
+
+def test_flat_peak_at_the_array_end():
+    array, plant = make_array()
+    calibrate(array)
+    lit = [1000] * N
+    lit[N - 2] = lit[N - 1] = 3000
+    read(array, plant, lit)
+    assert array.getPosition() == 5.5 * IR_PITCH_MM
+
+
+def test_lost_line_stays_on_the_side_last_seen():
+    array, plant = make_array()
+    calibrate(array)
+    read(array, plant, [1000] * N)
+    assert not array.isLinePresent()
+    assert array.getPosition() == 0.0
+    read(array, plant, line_at(N - 1))
+    read(array, plant, [1000] * N)
+    assert not array.isLinePresent()
+    assert array.getPosition() == (N + 1) / 2 * IR_PITCH_MM
+    read(array, plant, line_at(1))
+    read(array, plant, [1000] * N)
+    assert array.getPosition() == -(N + 1) / 2 * IR_PITCH_MM
+
+
+def test_scales_from_calibrations():
+    array, plant = make_array()
+    array.darkValue = [3000] * N
+    array.lightValue = [1000] * N
+    array.darkValue[1] = 500    # Reads lower over the line than off it
+    array.darkValue[2] = 1000   # No contrast
+    array._computeScales()
+    assert array.span[0] == 2000 and array.sign[0] == 1
+    assert array.scale[0] == (IR_ONE << IR_SHIFT) // 2000
+    assert array.light[0] == 1000
+    assert array.span[1] == 500 and array.sign[1] == -1
+    assert array.scale[1] == (IR_ONE << IR_SHIFT) // 500
+    assert array.span[2] == 0 and array.scale[2] == 0
+
+
+def test_scales_need_both_calibrations():
+    array, plant = make_array()
+    array.darkValue = [3000] * N
+    array._computeScales()
+    assert list(array.scale) == [0] * N
+
+
+def test_normalize_in_fixed_point():
+    array, plant = make_array()
+    array.darkValue = [3000] * N
+    array.lightValue = [1000] * N
+    array.darkValue[5] = 500
+    array.darkValue[6] = 1000
+    array._computeScales()
+    lit = [1000] * N
+    lit[0] = 3000      # Dark
+    lit[1] = 2000      # Half way
+    lit[2] = 4000      # Beyond dark
+    lit[3] = 0         # Beyond light
+    lit[4] = 1500      # A quarter of the way
+    lit[5] = 750       # Half way, with dark reading low
+    read(array, plant, lit)
+    norm = array.normalized_value_list
+    assert norm[0] == IR_ONE
+    assert abs(norm[1] - IR_ONE // 2) <= 1
+    assert norm[2] == IR_ONE
+    assert norm[3] == 0
+    assert abs(norm[4] - IR_ONE // 4) <= 1
+    assert abs(norm[5] - IR_ONE // 2) <= 1
+    assert norm[6] == IR_ONE // 2   # Calibrations alike: neither dark nor light
+    assert all(isinstance(value, int) for value in norm)
+    assert array.total == sum(norm)
+    assert array.weighted_sum == sum((idx + 1) * value
+                                     for idx, value in enumerate(norm))
+    assert array.getCentroid() == array.weighted_sum / array.total
+
+
+class RampPlant(FakePlant):
+    """
+    Plant whose batch conversions rise by one count with each tick, so
+    averaging them can be checked.
+    """
+    def adc_read_multi(self, names, bufs, index, convert_us):
+        FakePlant.adc_read_multi(self, names, bufs, index, convert_us)
+        for buf in bufs:
+            buf[index] += index
+
+
+def test_batch_reading_averages_each_channel():
+    board.reset()
+    plant = RampPlant()
+    board.attach(plant)
+    array = IR_Array(IR_PINS, EVEN_PIN, ODD_PIN, batch_timer=6, oversample=4)
+    plant.lit = [100 * idx for idx in range(N)]
+    array.start()
+    assert array.collect()
+    # Each channel reads lit + 0, 1, 2, 3, averaged down to lit + 1
+    assert list(array.raw_value_list) == [100 * idx + 1 for idx in range(N)]
+    assert len(plant.reads) == 4 * N
+    assert array.overruns == 0
+
+
+def test_batch_timer_leaves_time_for_each_conversion():
+    array, plant = make_array(batch_timer=6, sample_freq=25000, window=2)
+    # Thirteen conversions need 13 * ADC_CONVERT_US plus a quarter
+    full_freq = array._full[2][0][3]
+    assert full_freq == 1000000 // (N * ADC_CONVERT_US * 5 // 4)
+    # A window's seven odd-bank channels fit in a faster tick
+    assert array._full[2][1][3] == 1000000 // (7 * ADC_CONVERT_US * 5 // 4)
+    # Five channels still leave room, so the timer runs at sample_freq
+    assert array._windows[0][2][0][3] == 25000
+    array.start()
+    array.collect()
+    assert array.timer.freq() == full_freq
+
+
+def test_start_returns_before_the_sensors_settle():
+    array, plant = make_array()
+    start = board.clock.now_us
+    array.start()
+    assert board.clock.now_us - start < SETTLE_US
+    assert board.pins[ODD_PIN]._value and board.pins[EVEN_PIN]._value
+    assert not array.settled()
+    board.clock.advance(SETTLE_US)
+    assert array.settled()
+    assert array.collect()
+    assert not board.pins[ODD_PIN]._value and not board.pins[EVEN_PIN]._value
+
+
+def test_settle_timer_calls_back_once_per_wait():
+    calls = []
+    board.reset()
+    plant = FakePlant()
+    board.attach(plant)
+    array = IR_Array(IR_PINS, EVEN_PIN, ODD_PIN, settle_timer=7,
+                     on_settled=lambda: calls.append(board.clock.now_us))
+    array.start()
+    start = board.clock.now_us
+    assert array.isSettling()
+    board.clock.advance_to(start + SETTLE_US - 5)
+    board.fire_timers()
+    assert calls == []
+    board.clock.advance_to(start + 4 * SETTLE_US)
+    board.fire_timers()
+    assert len(calls) == 1
+    assert not array.isSettling()
+    assert array.collect()
+
+
+def test_differential_reading_subtracts_ambient():
+    array, plant = make_array(sampling=DIFFERENTIAL)
+    plant.ambient = [3000] * N
+    plant.lit = [1000] * N
+    plant.lit[0] = 3100   # Reads higher lit than dark: clamped
+    array.start()
+    # The emitters-off reading is taken before the emitters go on
+    assert {(odd, even) for idx, odd, even in plant.reads} == {(0, 0)}
+    assert array.collect()
+    assert array.raw_value_list[1] == ADC_MAX - 2000
+    assert array.raw_value_list[0] == ADC_MAX
+
+
+def test_banked_reading_lights_one_bank_at_a_time():
+    array, plant = make_array(sampling=DIFFERENTIAL_BANKED)
+    plant.ambient = [2000] * N
+    plant.lit = [500 + 10 * idx for idx in range(N)]
+    array.start()
+    assert len(plant.reads) == N
+    assert {(odd, even) for idx, odd, even in plant.reads} == {(0, 0)}
+    assert board.pins[ODD_PIN]._value and not board.pins[EVEN_PIN]._value
+    plant.reads.clear()
+    # The ODD bank lights sensors 1, 3, ..., which are read first
+    assert not array.collect()
+    assert [idx for idx, odd, even in plant.reads] == list(range(0, N, 2))
+    assert {(odd, even) for idx, odd, even in plant.reads} == {(1, 0)}
+    assert not board.pins[ODD_PIN]._value and board.pins[EVEN_PIN]._value
+    assert not array.settled()
+    plant.reads.clear()
+    assert array.collect()
+    assert [idx for idx, odd, even in plant.reads] == list(range(1, N, 2))
+    assert {(odd, even) for idx, odd, even in plant.reads} == {(0, 1)}
+    assert not board.pins[ODD_PIN]._value and not board.pins[EVEN_PIN]._value
+    assert list(array.raw_value_list) == [ADC_MAX - (2000 - 500 - 10 * idx)
+                                          for idx in range(N)]
+
+
+def test_banked_window_reads_only_its_channels():
+    array, plant = make_array(sampling=DIFFERENTIAL_BANKED, window=2)
+    calibrate(array)
+    plant.ambient = [3000] * N
+    read(array, plant, line_at(6, dark=3000, light=1000))
+    plant.reads.clear()
+    read(array, plant, line_at(6, dark=3000, light=1000))
+    assert sorted(idx for idx, odd, even in plant.reads) == \
+        [4, 4, 5, 5, 6, 6, 7, 7, 8, 8]
+    lit_reads = [(idx, odd, even) for idx, odd, even in plant.reads
+                 if odd or even]
+    assert lit_reads == [(4, 1, 0), (6, 1, 0), (8, 1, 0), (5, 0, 1), (7, 0, 1)]
+
+
+def sweep(array, readings):
+    """
+    Add each list of raw readings in 'readings' to the sweep statistics.
+    """
+    raw = array.raw_value_list
+    for values in readings:
+        for idx, value in enumerate(values):
+            raw[idx] = value
+        array.sweepSample()
+
+
+def test_sweep_mean_and_variance():
+    array, plant = make_array()
+    array.startSweep()
+    readings = [[(37 * count * (idx + 1)) % 4000 for idx in range(N)]
+                for count in range(200)]
+    sweep(array, readings)
+    assert array.sw_count == 200
+    for idx, variance in enumerate(array.getVariance()):
+        values = [values[idx] for values in readings]
+        assert array.sw_mean[idx] == pytest.approx(statistics.fmean(values),
+                                                   rel=1e-4)
+        assert variance == pytest.approx(statistics.pvariance(values),
+                                         rel=1e-3)
+        assert array.sw_min[idx] == min(values)
+        assert array.sw_max[idx] == max(values)
+
+
+def test_sweep_noise_from_quiet_changes():
+    array, plant = make_array()
+    array.startSweep()
+    # Steps of 10 counts are noise; the jumps on and off the line aren't
+    readings = [[1000 + 10 * (count % 2)] * N for count in range(20)]
+    readings += [[3000 + 10 * (count % 2)] * N for count in range(20)]
+    sweep(array, readings)
+    for noise in array.getNoise():
+        assert noise == pytest.approx(10 / math.sqrt(2), rel=1e-3)
+
+
+def test_sweep_converges_once_the_contrast_stops_growing():
+    array, plant = make_array()
+    array.startSweep()
+    sweep(array, [[1000] * N, [3000] * N])
+    assert array._sw_best >= SWEEP_MIN_CONTRAST
+    count = 0
+    while not array.sweepConverged():
+        sweep(array, [[2000] * N])
+        count += 1
+        assert count <= SWEEP_SETTLE
+    assert count == SWEEP_SETTLE
+
+
+def test_sweep_fails_while_a_sensor_sees_no_line():
+    array, plant = make_array()
+    array.startSweep()
+    dark = [3000] * N
+    dark[4] = 1000
+    for count in range(10 * SWEEP_SETTLE):
+        sweep(array, [[1000] * N, dark])
+    assert not array.sweepConverged()
+    # Starting again forgets the previous sweep
+    array.startSweep()
+    assert array.sw_count == 0 and list(array.sw_max) == [0] * N
+
+
+def test_finish_sweep_pulls_the_calibrations_in_by_the_noise():
+    array, plant = make_array()
+    array.startSweep()
+    readings = [[1000 + 10 * (count % 2)] * N for count in range(20)]
+    readings += [[3000 + 10 * (count % 2)] * N for count in range(20)]
+    sweep(array, readings)
+    dark, light = array.finishSweep()
+    margin = 2 * 10 / math.sqrt(2)
+    assert dark == [int(3010 - margin)] * N
+    assert light == [int(1000 + margin)] * N
+    assert array.span[0] == dark[0] - light[0]
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 2026
+
+@authors: Charith Sunku and Tomas Franco
+
+Purpose: Tests for the BNO055 driver. The sensor is a stand-in register map
+         on the simulator's I2C shim, with data registers set by each test.
+"""
+
+# ---------
+# Imports
+# ---------
+import struct
+
+import pyb
+import pytest
+
+from sim import board
+from bno055 import BNO055, load_profile, save_profile, _checksum
+from i2c_bus import I2CBus
+
+ADDRESS = 0x28
+
+
+class FakeIMU:
+    """
+    BNO055 register map. Reads are logged as (register, count).
+    """
+    def __init__(self):
+        self.registers = bytearray(0x80)
+        self.registers[BNO055.CHIP_ID] = 0xA0
+        self.reads = []
+
+    def read(self, reg, nbytes):
+        self.reads.append((reg, nbytes))
+        return self.registers[reg:reg + nbytes]
+
+    def write(self, reg, data):
+        self.registers[reg:reg + len(data)] = data
+
+    def set_sample(self, gyro, euler):
+        """
+        Set the gyro and Euler registers, in 1/16 degree (per second).
+        """
+        struct.pack_into('<6h', self.registers, BNO055.SAMPLE_ADDR,
+                         *gyro, *euler)
+
+
+def make_imu(**kwargs):
+    """
+    Return a driver on a freshly reset board, and its sensor.
+    """
+    board.reset()
+    device = FakeIMU()
+    board.i2c_devices[ADDRESS] = device
+    i2c = pyb.I2C(1, pyb.I2C.CONTROLLER)
+    return BNO055(i2c, address=ADDRESS, **kwargs), device
+
+
+def test_sample_read_in_one_transfer():
+    imu, device = make_imu()
+    device.set_sample((-32, 16, 800), (1440, -8, 24))
+    device.reads.clear()
+    sample = imu.read_sample()
+    assert device.reads == [(BNO055.SAMPLE_ADDR, BNO055.SAMPLE_LEN)]
+    assert list(sample) == [-32, 16, 800, 1440, -8, 24]
+    assert imu.get_heading() == 90.0
+    assert imu.get_yaw_rate() == 50.0
+
+
+def test_sample_reads_reuse_their_buffers():
+    imu, device = make_imu()
+    buf, sample = imu._buf, imu.sample
+    device.set_sample((0, 0, 0), (16, 0, 0))
+    imu.read_sample()
+    device.set_sample((0, 0, -16), (32, 0, 0))
+    assert imu.read_sample() is sample
+    assert imu._buf is buf
+    assert list(sample) == [0, 0, -16, 32, 0, 0]
+
+
+def test_cached_heading_read_at_most_once_per_age():
+    imu, device = make_imu(max_age_us=5000)
+    device.set_sample((0, 0, 0), (160, 0, 0))
+    device.reads.clear()
+    assert imu.get_corrected_heading() == 10.0
+    device.set_sample((0, 0, 0), (320, 0, 0))
+    assert imu.get_corrected_heading() == 10.0
+    assert device.reads == [(BNO055.EULER_DATA_ADDR, 2)]
+    board.clock.advance(5000)
+    assert imu.get_corrected_heading() == 20.0
+    assert len(device.reads) == 2
+
+
+def test_subscribed_reads_count_stale_samples():
+    imu, device = make_imu(max_age_us=15000)
+    bus = I2CBus(1)
+    imu.subscribe(bus, 10)
+    device.set_sample((0, 0, 0), (480, 0, 0))
+    # Nothing has been read yet
+    imu.refresh()
+    assert imu.stale_reads == 1
+    while bus.service():
+        pass
+    device.reads.clear()
+    assert imu.get_corrected_heading() == 30.0
+    assert imu.get_heading() == 30.0
+    assert imu.stale_reads == 1
+    # The bus falls behind, and the cached heading is served but counted
+    board.clock.advance(16000)
+    assert imu.get_corrected_heading() == 30.0
+    assert imu.get_heading() == 30.0
+    assert imu.stale_reads == 3
+    assert device.reads == []
+
+
+def test_fletcher_checksum():
+    # Check values of Fletcher-16
+    assert _checksum(b'abcde') == 0xC8F0
+    assert _checksum(b'abcdef') == 0x2057
+    assert _checksum(b'') == 0
+
+
+def test_profile_round_trip(tmp_path):
+    path = str(tmp_path / 'imu_cal.bin')
+    coeffs = bytes(range(1, 23))
+    save_profile(path, coeffs)
+    assert load_profile(path) == coeffs
+
+
+def test_bad_profiles_are_rejected(tmp_path):
+    path = tmp_path / 'imu_cal.bin'
+    assert load_profile(str(path)) is None
+    coeffs = bytes(range(1, 23))
+    save_profile(str(path), coeffs)
+    good = path.read_bytes()
+    # A flipped bit in the coefficients
+    path.write_bytes(good[:10] + bytes((good[10] ^ 0x04,)) + good[11:])
+    assert load_profile(str(path)) is None
+    # A flipped bit in the checksum
+    path.write_bytes(good[:-1] + bytes((good[-1] ^ 0x01,)))
+    assert load_profile(str(path)) is None
+    # A different file format, and a truncated file
+    path.write_bytes(b'X055' + good[4:])
+    assert load_profile(str(path)) is None
+    path.write_bytes(good[:-2])
+    assert load_profile(str(path)) is None
+
+
+def test_profile_must_be_22_bytes(tmp_path):
+    path = str(tmp_path / 'imu_cal.bin')
+    with pytest.raises(ValueError):
+        save_profile(path, bytes(21))
+    assert load_profile(path) is None
+
+
+def test_saved_calibration_only_rewritten_when_changed(tmp_path):
+    path = str(tmp_path / 'imu_cal.bin')
+    imu, device = make_imu()
+    device.registers[BNO055.CALIB_DATA_ADDR:BNO055.CALIB_DATA_ADDR + 22] = \
+        bytes(range(22))
+    assert imu.save_calibration(path)
+    assert not imu.save_calibration(path)
+    assert load_profile(path) == bytes(range(22))
+    assert imu.mode == BNO055.NDOF_MODE
+    # A loaded profile is written to the sensor before fusion starts
+    board.i2c_devices[ADDRESS] = device = FakeIMU()
+    BNO055(pyb.I2C(1, pyb.I2C.CONTROLLER), address=ADDRESS,
+           calibration=load_profile(path))
+    assert device.registers[BNO055.CALIB_DATA_ADDR:
+                            BNO055.CALIB_DATA_ADDR + 22] == bytes(range(22))
+    assert device.registers[BNO055.OPR_MODE] == BNO055.NDOF_MODE
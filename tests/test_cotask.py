@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 2026
+
+@authors: Charith Sunku and Tomas Franco
+
+Purpose: Tests for the cotask schedulers. Every test runs its tasks on a
+         VirtualClock, with each task advancing the clock by its run time, so
+         the schedules are exact and reproducible.
+"""
+
+# ---------
+# Imports
+# ---------
+import cotask
+
+
+def make_task(clock, name, period=None, cost_us=0, log=None, **kwargs):
+    """
+    Return a task which takes 'cost_us' of virtual time each run and, if
+    'log' is given, appends (name, start time) to it.
+    """
+    def run():
+        while True:
+            if log is not None:
+                log.append((name, clock.now))
+            clock.advance(cost_us)
+            yield 0
+    return cotask.Task(run, name=name, period=period, clock=clock, **kwargs)
+
+
+def make_list(clock, *tasks):
+    """
+    Return a task list on 'clock' holding 'tasks'.
+    """
+    task_list = cotask.TaskList(clock=clock)
+    for task in tasks:
+        task_list.append(task)
+    return task_list
+
+
+def run_until(sched, clock, end_us):
+    """
+    Call the scheduler 'sched' until the clock reaches 'end_us'.
+    """
+    while clock.now < end_us:
+        sched()
+
+
+# ---------------------------------
+# Earliest Deadline First
+# ---------------------------------
+def test_edf_runs_earliest_deadline_first():
+    clock = cotask.VirtualClock()
+    log = []
+    fast = make_task(clock, 'fast', period=5, log=log, priority=1)
+    slow = make_task(clock, 'slow', period=10, log=log, priority=5)
+    task_list = make_list(clock, fast, slow)
+    run_until(task_list.edf_sched, clock, 10001)
+    # Both are released at 10 ms; fast's deadline is 15 ms, slow's 20 ms
+    assert log == [('fast', 5000), ('fast', 10000), ('slow', 10000)]
+
+
+def test_edf_priority_breaks_ties():
+    clock = cotask.VirtualClock()
+    log = []
+    low = make_task(clock, 'low', period=10, log=log, priority=1)
+    high = make_task(clock, 'high', period=10, log=log, priority=2)
+    task_list = make_list(clock, low, high)
+    run_until(task_list.edf_sched, clock, 10001)
+    assert log == [('high', 10000), ('low', 10000)]
+
+
+def test_edf_idles_to_next_release():
+    clock = cotask.VirtualClock()
+    task_list = make_list(clock, make_task(clock, 'task', period=7))
+    task_list.edf_sched()
+    assert clock.now == 7000
+
+
+def test_edf_counts_deadline_misses():
+    clock = cotask.VirtualClock()
+    late = make_task(clock, 'late', period=10, cost_us=6000, priority=1)
+    other = make_task(clock, 'other', period=10, cost_us=6000, priority=2)
+    task_list = make_list(clock, late, other)
+    run_until(task_list.edf_sched, clock, 25000)
+    # Released together at 10 ms, 'late' only finishes at 22 ms
+    assert late._dl_misses == 1
+    assert other._dl_misses == 0
+
+
+# ---------------------------------
+# Cyclic Executive
+# ---------------------------------
+def test_cyclic_table_spreads_tasks():
+    clock = cotask.VirtualClock()
+    task_list = make_list(clock, make_task(clock, 'a', period=10),
+                          make_task(clock, 'b', period=20),
+                          make_task(clock, 'c', period=20))
+    tick, starts, indices, tasks = task_list.build_table()
+    assert tick == 10000
+    assert len(starts) == 3
+    # 'a' runs in both slots, 'b' and 'c' one each
+    assert [len(indices[starts[n]:starts[n + 1]]) for n in range(2)] == [2, 2]
+
+
+def test_cyclic_table_with_many_entries():
+    clock = cotask.VirtualClock()
+    periods = (1, 1, 1, 1, 1, 19, 1000)
+    task_list = make_list(clock, *[make_task(clock, str(idx), period=per)
+                                   for idx, per in enumerate(periods)])
+    tick, starts, indices, tasks = task_list.build_table()
+    assert len(starts) == 19001
+    assert starts[-1] == 5 * 19000 + 1000 + 19
+
+
+def test_cyclic_table_too_long():
+    clock = cotask.VirtualClock()
+    task_list = make_list(clock, make_task(clock, 'a', period=1),
+                          make_task(clock, 'b', period=100.003))
+    try:
+        task_list.build_table()
+    except ValueError:
+        return
+    assert False, "expected ValueError"
+
+
+def test_cyclic_runs_at_slot_times():
+    clock = cotask.VirtualClock()
+    log = []
+    task_list = make_list(clock, make_task(clock, 'a', period=10, log=log),
+                          make_task(clock, 'b', period=20, cost_us=100,
+                                    log=log))
+    run_until(task_list.cyc_sched, clock, 40001)
+    assert [entry for entry in log if entry[0] == 'a'] == \
+        [('a', 10000), ('a', 20000), ('a', 30000), ('a', 40000)]
+    assert len([entry for entry in log if entry[0] == 'b']) == 2
+
+
+def test_cyclic_runs_go_tasks_between_ticks():
+    clock = cotask.VirtualClock()
+    log = []
+    event = make_task(clock, 'event', log=log)
+    task_list = make_list(clock, make_task(clock, 'tick', period=10),
+                          event)
+    clock.advance(2000)
+    event.go()
+    task_list.cyc_sched()
+    assert log == [('event', 2000)]
+    # Nothing more to do before the first tick
+    task_list.cyc_sched()
+    assert clock.now == 12000
+
+
+# ---------------------------------
+# Overrun Policies
+# ---------------------------------
+def run_overrun(policy):
+    """
+    Run a 10 ms task whose first run takes 35 ms under 'policy', and return
+    the task and its start times up to 60 ms.
+    """
+    clock = cotask.VirtualClock()
+    starts = []
+
+    def run():
+        cost = 35000
+        while True:
+            starts.append(clock.now)
+            clock.advance(cost)
+            cost = 0
+            yield 0
+    task = cotask.Task(run, name='slow', period=10, clock=clock,
+                       overrun=policy)
+    task_list = make_list(clock, task)
+    run_until(task_list.pri_sched, clock, 60001)
+    return task, starts
+
+
+def test_overrun_catch_up():
+    task, starts = run_overrun(cotask.CATCH_UP)
+    # The releases at 20, 30 and 40 ms are all made up at 45 ms; the first
+    # two are counted as missed, being run more than a period late
+    assert starts == [10000, 45000, 45000, 45000, 50000, 60000]
+    assert task._missed == 2
+
+
+def test_overrun_skip():
+    task, starts = run_overrun(cotask.SKIP)
+    assert starts == [10000, 45000, 50000, 60000]
+    assert task._missed == 2
+
+
+def test_overrun_rephase():
+    task, starts = run_overrun(cotask.REPHASE)
+    assert starts == [10000, 45000, 55000]
+    assert task._missed == 2
+
+
+# ---------------------------------
+# Virtual Clock and Tracing
+# ---------------------------------
+def test_virtual_clock_wraps_like_ticks():
+    clock = cotask.VirtualClock(cotask.TICKS_PERIOD - 5000)
+    log = []
+    task_list = make_list(clock, make_task(clock, 'task', period=10,
+                                           log=log, trace=True))
+    run_until(task_list.pri_sched, clock, cotask.TICKS_PERIOD + 30000)
+    times = [entry[1] for entry in log]
+    assert [later - earlier for earlier, later in zip(times, times[1:])] \
+        == [10000, 10000]
+
+
+def test_trace_in_long_runs():
+    clock = cotask.VirtualClock(1 << 33)
+    states = iter(range(1000000))
+
+    def run():
+        while True:
+            clock.advance(1000)
+            yield next(states)
+    task = cotask.Task(run, name='traced', period=10, clock=clock, trace=4)
+    task_list = make_list(clock, task)
+    run_until(task_list.pri_sched, clock, (1 << 33) + 100000)
+    # MicroPython's 'L' arrays hold 32 bits, though CPython's may hold more
+    assert max(task._tr_time) < 1 << 32
+    trace = task.get_trace()
+    assert 'earlier transitions lost' in trace
+    assert trace.splitlines()[-1].endswith('-> 8')
+
+
+# ---------------------------------
+# Load Meter
+# ---------------------------------
+def test_load_meter():
+    clock = cotask.VirtualClock()
+    task = make_task(clock, 'task', period=10, cost_us=2500)
+    task_list = make_list(clock, task)
+    run_until(task_list.pri_sched, clock, 2500000)
+    assert abs(task_list.load - 25.0) < 1.0
+    assert abs(task.load - 25.0) < 1.0
+
+
+def test_load_meter_when_overloaded():
+    clock = cotask.VirtualClock()
+    task_list = make_list(clock, make_task(clock, 'a', period=10, cost_us=8000),
+                          make_task(clock, 'b', period=10, cost_us=8000))
+    run_until(task_list.pri_sched, clock, 2500000)
+    assert task_list.load > 99.0
+
+
+# ---------------------------------
+# Starting Tasks with go()
+# ---------------------------------
+def test_go_runs_untimed_task():
+    clock = cotask.VirtualClock()
+    log = []
+    event = make_task(clock, 'event', log=log)
+    task_list = make_list(clock, make_task(clock, 'tick', period=10), event)
+    clock.advance(3000)
+    event.go(True)
+    task_list.edf_sched()
+    assert log == [('event', 3000)]
+
+
+def test_edf_go_on_timed_task_with_same_deadline():
+    clock = cotask.VirtualClock()
+    runs = []
+
+    def run():
+        while True:
+            runs.append(clock.now)
+            # Take the whole period, then ask to run again at once
+            clock.advance(10000)
+            task.go()
+            yield 0
+    task = cotask.Task(run, name='busy', period=10, clock=clock)
+    task_list = make_list(clock, task)
+    run_until(task_list.edf_sched, clock, 100000)
+    assert len(runs) == 9
+
+
+def test_append_keeps_queued_wakeups():
+    clock = cotask.VirtualClock()
+    log = []
+    first = make_task(clock, 'first', log=log)
+    second = make_task(clock, 'second', log=log)
+    task_list = make_list(clock, first, second)
+    second.go()
+    first.go()
+    task_list.append(make_task(clock, 'third', log=log))
+    task_list.edf_sched()
+    task_list.edf_sched()
+    # Equal deadlines, so the order they were added in decides
+    assert log == [('first', 0), ('second', 0)]
+
+
+# ---------------------------------
+# Pipelines
+# ---------------------------------
+def test_pipeline_runs_consumers_in_same_pass():
+    clock = cotask.VirtualClock()
+    log = []
+    sensor = make_task(clock, 'sensor', period=8, cost_us=100, log=log)
+    control = make_task(clock, 'control', cost_us=50, log=log)
+    motor = make_task(clock, 'motor', log=log)
+    sensor.feeds(control)
+    control.feeds(motor)
+    task_list = make_list(clock, sensor, control, motor)
+    task_list.edf_sched()
+    task_list.edf_sched()
+    assert log == [('sensor', 8000), ('control', 8100), ('motor', 8150)]
+
+
+def test_pipeline_waits_for_producer_to_finish():
+    clock = cotask.VirtualClock()
+    log = []
+
+    def sensor_run():
+        while True:
+            # Start a reading, run again to finish it, then pass it on
+            log.append(('start', clock.now))
+            sensor.go()
+            yield 0
+            log.append(('finish', clock.now))
+            yield 1
+    sensor = cotask.Task(sensor_run, name='sensor', period=8, clock=clock)
+    control = make_task(clock, 'control', log=log)
+    sensor.feeds(control)
+    task_list = make_list(clock, sensor, control)
+    for _ in range(3):
+        task_list.edf_sched()
+    assert [entry[0] for entry in log] == ['start', 'finish', 'control']
+
+
+def test_pipeline_held_until_woken():
+    clock = cotask.VirtualClock()
+    log = []
+
+    def sensor_run():
+        while True:
+            # Start a reading and wait, without running, to be woken
+            log.append(('start', clock.now))
+            sensor.hold()
+            yield 0
+            log.append(('finish', clock.now))
+            yield 1
+    sensor = cotask.Task(sensor_run, name='sensor', period=8, clock=clock)
+    control = make_task(clock, 'control', log=log)
+    sensor.feeds(control)
+    task_list = make_list(clock, sensor, control)
+    task_list.edf_sched()
+    task_list.edf_sched()
+    assert [entry[0] for entry in log] == ['start']
+    # As from the interrupt which ends the wait
+    sensor.go(True)
+    task_list.edf_sched()
+    assert [entry[0] for entry in log] == ['start', 'finish', 'control']
+
+
+def test_pipeline_loop_rejected():
+    clock = cotask.VirtualClock()
+    first = make_task(clock, 'first')
+    second = make_task(clock, 'second')
+    first.feeds(second)
+    try:
+        second.feeds(first)
+    except ValueError:
+        return
+    assert False, "expected ValueError"
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 2026
+
+@authors: Charith Sunku and Tomas Franco
+
+Purpose: Tests for the encoder's 32-bit extended count, its moving
+         average and its alpha-beta velocity tracker. The timers are the simulator's shims with no plant
+         attached, so each test sets the counter and the update flag itself.
+"""
+
+# ---------
+# Imports
+# ---------
+import pytest
+
+from sim import board
+from encoder import Encoder, TIM_SR_UIF
+
+
+def make_encoder(**kwargs):
+    """
+    Return an encoder on a freshly reset board.
+    """
+    board.reset()
+    return Encoder(2, "A15", "B3", **kwargs)
+
+
+def test_count_includes_interrupt_wraps():
+    enc = make_encoder()
+    enc.timer.counter(100)
+    enc.timer._callback(enc.timer)
+    assert enc.get_count() == 65536 + 100
+
+
+def test_pending_wrap_up_counted_once():
+    enc = make_encoder()
+    # The counter has wrapped up past 0xFFFF, but the interrupt hasn't run
+    enc.timer.counter(5)
+    enc.timer._sr = TIM_SR_UIF
+    assert enc.get_count() == 65536 + 5
+    assert enc.timer._sr & TIM_SR_UIF == 0
+    assert enc.get_count() == 65536 + 5
+
+
+def test_pending_wrap_down_counted_once():
+    enc = make_encoder()
+    enc.timer.counter(0xFFFF - 5)
+    enc.timer._sr = TIM_SR_UIF
+    assert enc.get_count() == -6
+    assert enc.get_count() == -6
+
+
+def step(enc, counts, dt_us=10000):
+    """
+    Turn the wheel 'counts' over 'dt_us' of virtual time, then update.
+    """
+    board.clock.advance(dt_us)
+    enc.timer.counter((enc.timer.counter() + counts) & 0xFFFF)
+    enc.update()
+
+
+# ---------------------------------
+# Moving Average Ring Buffers
+# ---------------------------------
+def test_ring_buffers_hold_latest_updates():
+    enc = make_encoder(window=4)
+    dts = []
+    for counts in (3, 5, 7):
+        step(enc, counts)
+        dts.append(enc.dt)
+    assert list(enc.delta_buffer) == [3, 5, 7, 0]
+    assert list(enc.dt_buffer) == dts + [0]
+    assert enc.head == 3
+
+
+def test_ring_buffers_wrap_around():
+    enc = make_encoder()
+    dts = []
+    for counts in range(1, 10):
+        step(enc, counts)
+        dts.append(enc.dt)
+    # Window of 6: updates 7 to 9 have replaced the oldest three
+    assert list(enc.delta_buffer) == [7, 8, 9, 4, 5, 6]
+    assert list(enc.dt_buffer) == dts[6:] + dts[3:6]
+    assert enc.head == 3
+
+
+def test_running_sums_match_buffers():
+    enc = make_encoder()
+    for counts in (4, -2, 9, 0, 13, -7, 5, 21, 1, -3, 8, 2, 6, 11):
+        step(enc, counts, dt_us=5000 + 100 * abs(counts))
+        assert enc.delta_sum == sum(enc.delta_buffer)
+        assert enc.dt_sum == sum(enc.dt_buffer)
+    dt_s = enc.dt_sum / 6 / 1000000
+    expected = enc.delta_sum / 6 * enc.conv_factor_rad / dt_s
+    assert enc.get_avg_velocity() == pytest.approx(expected)
+
+
+# ---------------------------------
+# Alpha-Beta Velocity Tracker
+# ---------------------------------
+@pytest.mark.parametrize('alpha', [0.2, 0.5, 0.8])
+def test_beta_critically_damped(alpha):
+    enc = make_encoder(alpha=alpha)
+    assert enc.beta == pytest.approx(2 - alpha - 2 * (1 - alpha) ** 0.5)
+    # The error follows z^2 - (2 - alpha - beta) z + (1 - alpha), which has
+    # a double root at sqrt(1 - alpha)
+    b = 2 - alpha - enc.beta
+    assert b * b - 4 * (1 - alpha) == pytest.approx(0, abs=1e-12)
+    assert b / 2 == pytest.approx((1 - alpha) ** 0.5)
+
+
+def test_constant_velocity_tracked_without_lag():
+    enc = make_encoder()
+    for update in range(60):
+        step(enc, 40)
+    counts_per_s = 40 / enc.get_dt()
+    assert enc.ab_velocity == pytest.approx(counts_per_s, rel=1e-6)
+    assert enc.ab_error == pytest.approx(0, abs=1e-4)
+    assert enc.get_velocity() == pytest.approx(
+        counts_per_s * enc.conv_factor_rad, rel=1e-6)
+
+
+def test_speed_change_tracked_without_lag():
+    enc = make_encoder()
+    # Start mid-range, so turning back doesn't wrap the counter
+    enc.timer.counter(0x8000)
+    enc.zero()
+    for update in range(30):
+        step(enc, 40)
+    # Reversing leaves no lasting error, and no drift from the turns so far
+    for update in range(60):
+        step(enc, -25)
+    assert enc.ab_velocity == pytest.approx(-25 / enc.get_dt(), rel=1e-6)
+    assert enc.ab_error == pytest.approx(0, abs=1e-4)
+    assert enc.position == 30 * 40 - 60 * 25
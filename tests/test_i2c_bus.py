@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 2026
+
+@authors: Charith Sunku and Tomas Franco
+
+Purpose: Tests for the I2C bus manager. The bus is the simulator's I2C shim,
+         talking to a stand-in device whose registers hold their own
+         addresses, so the data a subscription receives shows where it was
+         read from.
+"""
+
+# ---------
+# Imports
+# ---------
+from sim import board
+from i2c_bus import I2CBus, MERGE_GAP
+
+ADDRESS = 0x28
+
+
+class FakeDevice:
+    """
+    Device whose register n reads n. Reads are logged as (register, count).
+    """
+    def __init__(self):
+        self.registers = bytearray(range(256))
+        self.reads = []
+
+    def read(self, reg, nbytes):
+        self.reads.append((reg, nbytes))
+        return self.registers[reg:reg + nbytes]
+
+    def write(self, reg, data):
+        self.registers[reg:reg + len(data)] = data
+
+
+def make_bus():
+    """
+    Return a bus manager on a freshly reset board, and its device.
+    """
+    board.reset()
+    device = FakeDevice()
+    board.i2c_devices[ADDRESS] = device
+    return I2CBus(1), device
+
+
+def blocks(bus):
+    """
+    Return the (register, length) of each burst.
+    """
+    return sorted((burst.reg, len(burst.buf)) for burst in bus.bursts)
+
+
+def test_adjacent_and_overlapping_blocks_merge():
+    bus, device = make_bus()
+    gyro = bus.subscribe(ADDRESS, 0x14, 6, 10, lambda data: None)
+    euler = bus.subscribe(ADDRESS, 0x1A, 2, 10, lambda data: None)
+    inside = bus.subscribe(ADDRESS, 0x16, 2, 10, lambda data: None)
+    assert blocks(bus) == [(0x14, 8)]
+    while bus.service():
+        pass
+    assert device.reads == [(0x14, 8)]
+    assert bytes(gyro.data) == bytes(range(0x14, 0x1A))
+    assert bytes(euler.data) == bytes((0x1A, 0x1B))
+    assert bytes(inside.data) == bytes((0x16, 0x17))
+
+
+def test_blocks_merge_across_small_gaps_only():
+    bus, device = make_bus()
+    bus.subscribe(ADDRESS, 0x10, 2, 10, lambda data: None)
+    bus.subscribe(ADDRESS, 0x12 + MERGE_GAP, 2, 10, lambda data: None)
+    assert blocks(bus) == [(0x10, 4 + MERGE_GAP)]
+    bus.subscribe(ADDRESS, 0x40, 1, 10, lambda data: None)
+    assert blocks(bus) == [(0x10, 4 + MERGE_GAP), (0x40, 1)]
+
+
+def test_devices_are_never_merged():
+    bus, device = make_bus()
+    board.i2c_devices[0x29] = FakeDevice()
+    bus.subscribe(ADDRESS, 0x10, 2, 10, lambda data: None)
+    bus.subscribe(0x29, 0x12, 2, 10, lambda data: None)
+    assert sorted((burst.address, burst.reg) for burst in bus.bursts) == \
+        [(ADDRESS, 0x10), (0x29, 0x12)]
+
+
+def test_unsubscribe_splits_the_burst_again():
+    bus, device = make_bus()
+    low = bus.subscribe(ADDRESS, 0x10, 2, 10, lambda data: None)
+    bus.subscribe(ADDRESS, 0x30, 2, 10, lambda data: None)
+    bridge = bus.subscribe(ADDRESS, 0x12, 0x1E, 10, lambda data: None)
+    assert blocks(bus) == [(0x10, 0x22)]
+    bus.unsubscribe(bridge)
+    assert blocks(bus) == [(0x10, 2), (0x30, 2)]
+    while bus.service():
+        pass
+    assert sorted(device.reads) == [(0x10, 2), (0x30, 2)]
+    assert bytes(low.data) == bytes((0x10, 0x11))
+
+
+def test_service_sends_then_receives():
+    bus, device = make_bus()
+    got = []
+    bus.subscribe(ADDRESS, 0x1A, 2, 10,
+                  lambda data: got.append(bytes(data)))
+    assert bus.pending is None
+    # The first run only sends the register address
+    assert bus.service()
+    assert bus.pending is not None
+    assert device.reads == [] and got == []
+    # The second reads the data and passes it on
+    assert not bus.service()
+    assert device.reads == [(0x1A, 2)]
+    assert got == [bytes((0x1A, 0x1B))]
+    # Nothing is due until the period is up
+    assert not bus.service()
+    assert device.reads == [(0x1A, 2)]
+    board.clock.advance(10000)
+    assert bus.service()
+    assert not bus.service()
+    assert len(got) == 2
+
+
+def test_only_due_subscriptions_are_called_back():
+    bus, device = make_bus()
+    fast, slow = [], []
+    bus.subscribe(ADDRESS, 0x14, 6, 10, lambda data: fast.append(1))
+    bus.subscribe(ADDRESS, 0x1A, 2, 20, lambda data: slow.append(1))
+    for period in range(4):
+        while bus.service():
+            pass
+        board.clock.advance(10000)
+    assert len(fast) == 4
+    assert len(slow) == 2
+    assert all(read == (0x14, 8) for read in device.reads)
+
+
+def test_late_reads_keep_their_phase():
+    bus, device = make_bus()
+    sub = bus.subscribe(ADDRESS, 0x1A, 2, 10, lambda data: None)
+    first_due = sub.next_us
+    # Served two and a half periods late, as after a long overrun
+    board.clock.advance(25000)
+    while bus.service():
+        pass
+    assert sub.next_us == first_due + 30000
+
+
+def test_stats_count_each_transfer():
+    bus, device = make_bus()
+    bus.subscribe(ADDRESS, 0x14, 8, 10, lambda data: None)
+    while bus.service():
+        pass
+    count, mean_us, max_us, busy = bus.get_stats()
+    assert count == 2
+    assert 0 < mean_us <= max_us
+    assert 0 < busy <= 100
+    bus.mem_read(1, ADDRESS, 0x00)
+    assert bus.get_stats()[0] == 3
+    bus.reset_stats()
+    assert bus.get_stats() == (0, 0, 0, 0.0)
+
+
+def test_passthrough_restarts_a_pending_read():
+    bus, device = make_bus()
+    got = []
+    bus.subscribe(ADDRESS, 0x1A, 2, 10,
+                  lambda data: got.append(bytes(data)))
+    assert bus.service()
+    # Moves the device's register pointer, so the sent address is stale
+    assert bus.mem_read(1, ADDRESS, 0x00) == bytes((0x00,))
+    assert bus.pending is None
+    assert bus.service()
+    assert not bus.service()
+    assert got == [bytes((0x1A, 0x1B))]
+
+
+def test_scheduled_load_from_the_bursts():
+    bus, device = make_bus()
+    bus.subscribe(ADDRESS, 0x14, 8, 10, lambda data: None)
+    # Address, register, address again and 8 data bytes, 9 bits each,
+    # 100 times a second at 400 kHz
+    assert abs(bus.get_scheduled_load() - 100 * 9 * 11 * 100 / 400000) < 1e-9
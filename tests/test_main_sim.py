@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 2026
+
+@authors: Charith Sunku and Tomas Franco
+
+Purpose: Tests which run the task set in main on the simulator, as
+         sim.run_main does, and check how the tasks use the drivers. Each
+         run gets fresh cotask and task_share modules, since main adds its
+         tasks and shares to their module-level lists.
+"""
+
+# ---------
+# Imports
+# ---------
+import os
+import sys
+
+from sim import board
+from sim import run_main
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_main_on_sim(tmp_path, monkeypatch, seconds, script, auto=True):
+    """
+    Run main for 'seconds' of virtual time with the operator 'script', with
+    AUTO_CALIBRATE set to 'auto'. Returns the IR_sensor module it used.
+    """
+    for name in ('cotask', 'task_share', 'IR_sensor'):
+        sys.modules.pop(name, None)
+    board.reset()
+    with open(os.path.join(REPO_DIR, 'main'), newline='') as file:
+        code = file.read()
+    if not auto:
+        code = code.replace('AUTO_CALIBRATE = True', 'AUTO_CALIBRATE = False')
+    main_path = tmp_path / 'main'
+    main_path.write_text(code, newline='')
+    monkeypatch.chdir(tmp_path)
+    import IR_sensor
+    return IR_sensor, lambda: run_main.main(
+        ['--seconds', str(seconds), '--script', script,
+         '--main', str(main_path), '--flash', str(tmp_path / 'flash')])
+
+
+def check_collects_follow_starts(tmp_path, monkeypatch, seconds, script, auto):
+    IR_sensor, run = run_main_on_sim(tmp_path, monkeypatch, seconds, script,
+                                     auto)
+    array = IR_sensor.IR_Array
+    start, collect = array.start, array.collect
+    counts = {'start': 0, 'collect': 0, 'orphan': 0}
+    pending = [False]
+
+    def counted_start(self, *args, **kwargs):
+        counts['start'] += 1
+        pending[0] = True
+        return start(self, *args, **kwargs)
+
+    def counted_collect(self):
+        counts['collect'] += 1
+        if not pending[0]:
+            counts['orphan'] += 1
+        done = collect(self)
+        if done:
+            pending[0] = False
+        return done
+
+    monkeypatch.setattr(array, 'start', counted_start)
+    monkeypatch.setattr(array, 'collect', counted_collect)
+    run()
+    assert counts['start'] > 0
+    assert counts['orphan'] == 0, counts
+
+
+def test_manual_calibration_collects_only_started_readings(tmp_path, monkeypatch):
+    # The run button is pressed at 3 s, so the IR task waits on it for 1 s
+    check_collects_follow_starts(tmp_path, monkeypatch, 4, 'manual', False)
+
+
+def test_sweep_calibration_collects_only_started_readings(tmp_path, monkeypatch):
+    # Covers the sweep's readings and the turn back onto the line
+    check_collects_follow_starts(tmp_path, monkeypatch, 4, 'auto', True)
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 2026
+
+@authors: Charith Sunku and Tomas Franco
+
+Purpose: Tests for the shares and queues, and for the tasks they wake when
+         data is put into them. The tasks run on a VirtualClock, as in the
+         cotask tests.
+"""
+
+# ---------
+# Imports
+# ---------
+import cotask
+import task_share
+
+
+def make_reader(clock, name, share, log):
+    """
+    Return an untimed task which appends (name, time, value read) to 'log'
+    each time it runs.
+    """
+    def run():
+        while True:
+            log.append((name, clock.now, share.get()))
+            yield 0
+    return cotask.Task(run, name=name, clock=clock)
+
+
+def make_list(clock, *tasks):
+    """
+    Return a task list on 'clock' holding 'tasks'.
+    """
+    task_list = cotask.TaskList(clock=clock)
+    for task in tasks:
+        task_list.append(task)
+    return task_list
+
+
+# ---------------------------------
+# Waking Tasks on put()
+# ---------------------------------
+def test_share_put_wakes_task():
+    clock = cotask.VirtualClock()
+    log = []
+    share = task_share.Share('h', name='wake')
+    reader = make_reader(clock, 'reader', share, log)
+    task_list = make_list(clock, reader)
+    share.wake_on_put(reader)
+    clock.advance(2000)
+    share.put(7)
+    assert reader.go_flag
+    task_list.edf_sched()
+    assert log == [('reader', 2000, 7)]
+    assert not reader.go_flag
+
+
+def test_share_without_wakeups_leaves_task_waiting():
+    clock = cotask.VirtualClock()
+    log = []
+    share = task_share.Share('h', name='quiet')
+    reader = make_reader(clock, 'reader', share, log)
+    make_list(clock, reader)
+    share.put(7)
+    assert not reader.go_flag
+
+
+def test_put_wakes_every_task_once():
+    clock = cotask.VirtualClock()
+    log = []
+    share = task_share.Share('h', name='fan out')
+    first = make_reader(clock, 'first', share, log)
+    second = make_reader(clock, 'second', share, log)
+    task_list = make_list(clock, first, second)
+    share.wake_on_put(first)
+    share.wake_on_put(second)
+    # Two puts before the tasks get to run still wake each of them once
+    share.put(1)
+    share.put(2)
+    task_list.edf_sched()
+    task_list.edf_sched()
+    assert log == [('first', 0, 2), ('second', 0, 2)]
+
+
+def test_queue_put_wakes_task():
+    clock = cotask.VirtualClock()
+    log = []
+    queue = task_share.Queue('h', 4, name='wake')
+    reader = make_reader(clock, 'reader', queue, log)
+    task_list = make_list(clock, reader)
+    queue.wake_on_put(reader)
+    clock.advance(500)
+    queue.put(3, in_ISR=True)
+    task_list.edf_sched()
+    assert log == [('reader', 500, 3)]
+
+
+# ---------------------------------
+# Time Stamps
+# ---------------------------------
+def test_stamp_defaults_to_zero():
+    share = task_share.Share('f', name='unstamped')
+    share.put(1.5)
+    assert share.stamp() == 0
+
+
+def test_stamp_tracks_latest_stamped_put():
+    share = task_share.Share('f', name='stamped')
+    share.put(1.0, stamp=5000)
+    assert share.stamp() == 5000
+    share.put(2.0, stamp=9000)
+    assert share.get() == 2.0
+    assert share.stamp() == 9000
+
+
+def test_put_without_stamp_keeps_previous_stamp():
+    share = task_share.Share('f', name='restamped')
+    share.put(1.0, stamp=9000)
+    share.put(2.0)
+    assert share.get() == 2.0
+    assert share.stamp() == 9000
+
+
+def test_stamp_passed_down_a_pipeline():
+    clock = cotask.VirtualClock()
+    source = task_share.Share('f', name='source')
+    sink = task_share.Share('f', name='sink')
+
+    def run():
+        while True:
+            # Take 3 ms to work on the data, then pass its stamp on
+            clock.advance(3000)
+            sink.put(2 * source.get(), stamp=source.stamp())
+            yield 0
+    stage = cotask.Task(run, name='stage', clock=clock)
+    task_list = make_list(clock, stage)
+    source.wake_on_put(stage)
+    clock.advance(1000)
+    source.put(4.0, stamp=clock.now)
+    task_list.edf_sched()
+    assert sink.get() == 8.0
+    assert sink.stamp() == 1000
+    assert clock.now - sink.stamp() == 3000